@@ -0,0 +1,200 @@
+"""Ce module permet de rechercher rapidement les séquences proches
+d'une séquence donnée grâce à un BK-tree.
+
+Le BK-tree est construit une seule fois sur toutes les séquences uniques,
+puis interrogé à chaque nouvelle famille : seules les branches dont la
+distance de Levenshtein peut encore être inférieure ou égale à dist_max
+sont parcourues. Pendant la recherche, la distance à chaque noeud est
+bornée (bounded_distance.py) par dist_max plus la plus grande distance
+vers ses enfants : au-delà, ni le noeud ni ses enfants ne peuvent être
+retenus.
+
+Usage:
+------
+    from bktree import BKTree
+
+    arbre = BKTree(sequences)
+    voisins = arbre.voisins(seq_max, dist_max)
+    arbre.retirer(seq_max)
+    graine = arbre.plus_proche(seq, dist_max)
+"""
+
+
+############ Modules à importer ############
+
+
+from tqdm import tqdm
+from Levenshtein import distance
+from bounded_distance import distance_bornee
+
+
+############################################
+
+
+def plus_grande_arete(noeud):
+    """Donne la plus grande distance entre un noeud et ses enfants.
+
+    Parameters
+    ----------
+    noeud : list
+        un noeud du BK-tree
+
+    Returns
+    -------
+    arete: int
+        la plus grande distance, 0 pour un noeud sans enfant
+    """
+    return 0 if noeud[2] is None else max(noeud[2])
+
+
+class BKTree:
+    """Arbre métrique (BK-tree) sur la distance de Levenshtein.
+
+    Chaque noeud est une liste [séquence, rang, enfants] où le rang est
+    l'ordre d'insertion de la séquence et enfants un dictionnaire
+    {distance: noeud} créé seulement si nécessaire.
+    Les séquences retirées restent dans l'arbre pour guider la recherche
+    mais ne sont plus renvoyées.
+    """
+
+    def __init__(self, sequences=()):
+        """Construit l'arbre.
+
+        Parameters
+        ----------
+        sequences : iterable
+            les séquences à insérer, dans l'ordre qui servira à trier
+            les résultats de la recherche
+        """
+        self.racine = None
+        self.taille = 0
+        self.retirees = set()
+
+        for seq in tqdm(sequences):
+            self.ajouter(seq)
+
+    def __len__(self):
+        return self.taille - len(self.retirees)
+
+    def ajouter(self, seq):
+        """Insère une séquence dans l'arbre.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence à insérer
+        """
+        noeud_seq = [seq, self.taille, None]
+
+        if self.racine is None:
+            self.racine = noeud_seq
+            self.taille += 1
+            return
+
+        noeud = self.racine
+
+        while True:
+            diff = distance(seq, noeud[0])
+            if diff == 0:
+                return
+            if noeud[2] is None:
+                noeud[2] = {}
+            if diff not in noeud[2]:
+                noeud[2][diff] = noeud_seq
+                self.taille += 1
+                return
+            noeud = noeud[2][diff]
+
+    def retirer(self, seq):
+        """Retire une séquence des résultats de recherche.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence à retirer
+        """
+        self.retirees.add(seq)
+
+    def voisins(self, seq, dist_max):
+        """Donne les séquences à une distance inférieure ou égale à dist_max.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence de référence
+
+        dist_max: int
+            la distance de Levenshtein maximum
+
+        Returns
+        -------
+        voisins: list
+            liste des séquences non retirées proches de seq, triées
+            dans l'ordre de leur insertion dans l'arbre.
+        """
+        trouvees = []
+
+        if self.racine is None:
+            return trouvees
+
+        pile = [self.racine]
+
+        while pile:
+            noeud = pile.pop()
+            diff = distance_bornee(seq, noeud[0], dist_max + plus_grande_arete(noeud))
+            if diff <= dist_max and noeud[0] not in self.retirees:
+                trouvees.append((noeud[1], noeud[0]))
+            if noeud[2] is None:
+                continue
+            for diff_enfant, enfant in noeud[2].items():
+                if diff - dist_max <= diff_enfant <= diff + dist_max:
+                    pile.append(enfant)
+
+        trouvees.sort()
+
+        return [cle for rang, cle in trouvees]
+
+    def plus_proche(self, seq, dist_max):
+        """Donne la séquence la plus proche à une distance inférieure ou
+        égale à dist_max.
+
+        Le rayon de recherche est réduit à chaque séquence plus proche
+        trouvée.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence de référence
+
+        dist_max: int
+            la distance de Levenshtein maximum
+
+        Returns
+        -------
+        plus_proche: string
+            la séquence non retirée la plus proche de seq (la première
+            insérée en cas d'égalité), ou None si aucune séquence n'est à
+            une distance inférieure ou égale à dist_max.
+        """
+        meilleure = None
+        rayon = dist_max
+
+        if self.racine is None:
+            return None
+
+        pile = [self.racine]
+
+        while pile:
+            noeud = pile.pop()
+            diff = distance_bornee(seq, noeud[0], rayon + plus_grande_arete(noeud))
+            if diff <= rayon and noeud[0] not in self.retirees:
+                if meilleure is None or (diff, noeud[1]) < meilleure[:2]:
+                    meilleure = (diff, noeud[1], noeud[0])
+                    rayon = diff
+            if noeud[2] is None:
+                continue
+            for diff_enfant, enfant in noeud[2].items():
+                if diff - rayon <= diff_enfant <= diff + rayon:
+                    pile.append(enfant)
+
+        return None if meilleure is None else meilleure[2]
@@ -0,0 +1,147 @@
+"""Ce module permet de calculer une distance de Levenshtein bornée.
+
+On ne cherche jamais à connaître la distance exacte entre deux séquences
+mais seulement à savoir si elle est inférieure ou égale à dist_max :
+le calcul s'arrête donc dès que cette borne est dépassée.
+
+Usage:
+------
+    from bounded_distance import distance_bornee
+
+    if distance_bornee(seq1, seq2, dist_max) <= dist_max:
+        ...
+"""
+
+
+############ Modules à importer ############
+
+
+try:
+    from Levenshtein import distance
+except ImportError:
+    distance = None
+
+
+############################################
+
+
+def _accepte_score_cutoff():
+    """Vérifie si le module Levenshtein installé accepte une borne.
+
+    Returns
+    -------
+    bool
+        True si Levenshtein.distance accepte l'argument score_cutoff
+        (python-Levenshtein >= 0.20)
+    """
+    if distance is None:
+        return False
+
+    try:
+        distance("", "", score_cutoff = 0)
+    except TypeError:
+        return False
+
+    return True
+
+
+SCORE_CUTOFF = _accepte_score_cutoff()
+
+
+def distance_bande(a, b, dist_max):
+    """Calcule la distance de Levenshtein dans une bande de largeur
+    2 * dist_max + 1 autour de la diagonale.
+
+    Parameters
+    ----------
+    a : string
+        première séquence
+
+    b: string
+        deuxième séquence
+
+    dist_max: int
+        la distance de Levenshtein maximum recherchée
+
+    Returns
+    -------
+    diff: int
+        la distance de Levenshtein si elle est inférieure ou égale à
+        dist_max, dist_max + 1 sinon.
+    """
+    hors_borne = dist_max + 1
+    n = len(a)
+    m = len(b)
+
+    if abs(n - m) > dist_max:
+        return hors_borne
+
+    precedente = [j if j <= dist_max else hors_borne for j in range(m + 1)]
+
+    for i in range(1, n + 1):
+        debut = max(1, i - dist_max)
+        fin = min(m, i + dist_max)
+        courante = [hors_borne] * (m + 1)
+        if i <= dist_max:
+            courante[0] = i
+        minimum = courante[debut - 1]
+        base = a[i - 1]
+
+        for j in range(debut, fin + 1):
+            diff = precedente[j - 1] + (base != b[j - 1])
+            if precedente[j] + 1 < diff:
+                diff = precedente[j] + 1
+            if courante[j - 1] + 1 < diff:
+                diff = courante[j - 1] + 1
+            if diff > hors_borne:
+                diff = hors_borne
+            courante[j] = diff
+            if diff < minimum:
+                minimum = diff
+
+        if minimum > dist_max:
+            return hors_borne
+
+        precedente = courante
+
+    return precedente[m]
+
+
+def distance_bornee(a, b, dist_max):
+    """Calcule la distance de Levenshtein entre deux séquences en
+    s'arrêtant dès qu'elle dépasse dist_max.
+
+    Les paires dont la différence de longueur dépasse dist_max sont
+    rejetées sans calcul. Le calcul est ensuite délégué au module
+    Levenshtein quand il accepte une borne. Une ancienne version du
+    module calcule la distance complète, qui reste plus rapide en C que
+    la bande en Python ; distance_bande n'est utilisée que si le module
+    Levenshtein n'est pas installé.
+
+    Parameters
+    ----------
+    a : string
+        première séquence
+
+    b: string
+        deuxième séquence
+
+    dist_max: int
+        la distance de Levenshtein maximum recherchée
+
+    Returns
+    -------
+    diff: int
+        la distance de Levenshtein si elle est inférieure ou égale à
+        dist_max, dist_max + 1 sinon.
+    """
+    if abs(len(a) - len(b)) > dist_max:
+        return dist_max + 1
+
+    if SCORE_CUTOFF:
+        return distance(a, b, score_cutoff = dist_max)
+
+    if distance is not None:
+        return min(distance(a, b), dist_max + 1)
+
+    return distance_bande(a, b, dist_max)
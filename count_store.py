@@ -0,0 +1,363 @@
+"""Ce code permet de compter une seule fois les séquences de fichiers
+fasta et de sauvegarder ces comptages dans un dossier, réutilisable
+ensuite par les autres scripts sans relire les fichiers fasta.
+
+Le dossier contient une matrice creuse rounds x séquences au format CSR
+(count_indptr.npy, count_indices.npy, count_data.npy), la liste des
+fichiers fasta comptés (rounds.txt) et le catalogue des séquences
+(voir seq_catalogue.py). Les familles créées par create_family.py --store
+y sont ajoutées sous la même forme (family_numbers.npy,
+family_indptr.npy, family_indices.npy et family_rounds.txt). Les tableaux
+sont relus par projection en mémoire (mmap).
+
+Usage:
+------
+    python3 count_store.py [-o dossier] arguments
+
+    arguments: le ou les fichier.s fasta à compter
+
+    -o dossier: le dossier dans lequel écrire les comptages
+    (count_store par défaut)
+"""
+
+
+############ Modules à importer ############
+
+
+import os
+import sys
+import numpy as np
+from tqdm import tqdm
+from fasta_reader import read_fasta, count_sequences, round_name
+from seq_catalogue import SeqCatalogue
+
+
+############################################
+
+
+DOSSIER = "count_store"
+
+
+def arguments():
+    """Vérifier le format et le nombre d'arguments renseigné.
+
+    Returns
+    -------
+    fichiers: liste de tous les fichiers donnés en argument.
+
+    dossier: le dossier dans lequel écrire les comptages.
+    """
+
+    fichiers = []
+    dossier = DOSSIER
+    index = 1
+
+    while index < len(sys.argv):
+        if sys.argv[index] == "-o":
+            index += 1
+            if index == len(sys.argv):
+                sys.exit("L'option -o doit être suivie d'un nom de dossier")
+            dossier = sys.argv[index]
+        elif not sys.argv[index].endswith(".fas"):
+            sys.exit("Les fichiers renseignés doivent être au format fasta")
+        else:
+            fichiers.append(str(sys.argv[index]))
+        index += 1
+
+    if not fichiers:
+        sys.exit("Veuillez renseigner au moins un fichier fasta à lire")
+
+    return fichiers, dossier
+
+
+def build_count_store(fichiers, dossier = DOSSIER):
+    """compte les séquences de chaque fichier fasta et sauvegarde les
+    comptages.
+
+    Les identifiants des séquences sont attribués dans l'ordre de leur
+    première apparition en lisant les fichiers dans l'ordre donné.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta à lire
+
+    dossier: string
+        le dossier dans lequel écrire les comptages
+
+    Returns
+    -------
+    store: CountStore
+        les comptages sauvegardés, relus depuis le dossier
+    """
+    catalogue = SeqCatalogue()
+    indptr = [0]
+    indices = []
+    data = []
+
+    for fichier in fichiers:
+        compte = count_sequences(read_fasta(fichier))
+        identifiants = np.fromiter((catalogue.add(seq) for seq in tqdm(compte)), dtype = np.uint32, count = len(compte))
+        nombres = np.fromiter(compte.values(), dtype = np.uint32, count = len(compte))
+        del compte
+        ordre = np.argsort(identifiants, kind = "stable")
+        indices.append(identifiants[ordre])
+        data.append(nombres[ordre])
+        indptr.append(indptr[-1] + len(ordre))
+
+    os.makedirs(dossier, exist_ok = True)
+    catalogue.save(dossier)
+    np.save(os.path.join(dossier, "count_indptr.npy"), np.array(indptr, dtype = np.int64))
+    np.save(os.path.join(dossier, "count_indices.npy"), np.concatenate(indices) if indices else np.zeros(0, dtype = np.uint32))
+    np.save(os.path.join(dossier, "count_data.npy"), np.concatenate(data) if data else np.zeros(0, dtype = np.uint32))
+
+    with open(os.path.join(dossier, "rounds.txt"), "w") as filout:
+        for fichier in fichiers:
+            filout.write(f"{fichier}\n")
+
+    return CountStore(dossier)
+
+
+class CountStore:
+    """Comptages rounds x séquences relus depuis un dossier.
+
+    Les rounds sont désignés par le nom du fichier fasta compté ou par
+    le nom du round (R00, R01...).
+    """
+
+    def __init__(self, dossier = DOSSIER):
+        """Ouvre les comptages d'un dossier par projection en mémoire.
+
+        Parameters
+        ----------
+        dossier : string
+            le dossier écrit par build_count_store
+        """
+        self.dossier = dossier
+        self.indptr = np.load(os.path.join(dossier, "count_indptr.npy"), mmap_mode = "r")
+        self.indices = np.load(os.path.join(dossier, "count_indices.npy"), mmap_mode = "r")
+        self.data = np.load(os.path.join(dossier, "count_data.npy"), mmap_mode = "r")
+        self.catalogue = SeqCatalogue.load(dossier)
+
+        with open(os.path.join(dossier, "rounds.txt"), "r") as filin:
+            self.fichiers = [line.strip() for line in filin if line.strip()]
+
+        self.rounds = [round_name(fichier) for fichier in self.fichiers]
+
+    def _ligne(self, Round):
+        """Donne le numéro de ligne d'un round.
+
+        Parameters
+        ----------
+        Round : string
+            le nom du fichier fasta ou le nom du round
+
+        Returns
+        -------
+        ligne: int
+            le numéro de ligne du round dans la matrice
+        """
+        if Round in self.fichiers:
+            return self.fichiers.index(Round)
+
+        if round_name(Round) not in self.rounds:
+            sys.exit(f"Le round {Round} n'est pas compté dans {self.dossier}")
+
+        return self.rounds.index(round_name(Round))
+
+    def round_counts(self, Round):
+        """Donne les comptages d'un round.
+
+        Parameters
+        ----------
+        Round : string
+            le nom du fichier fasta ou le nom du round
+
+        Returns
+        -------
+        identifiants: numpy.ndarray
+            les identifiants des séquences présentes dans ce round, triés
+
+        nombres: numpy.ndarray
+            le nombre d'occurrences de chacune de ces séquences
+        """
+        ligne = self._ligne(Round)
+        debut, fin = self.indptr[ligne], self.indptr[ligne + 1]
+
+        return self.indices[debut:fin], self.data[debut:fin]
+
+    def round_size(self, Round):
+        """Donne le nombre de lectures d'un round.
+
+        Parameters
+        ----------
+        Round : string
+            le nom du fichier fasta ou le nom du round
+
+        Returns
+        -------
+        taille_round: int
+            le nombre de séquences présentes à ce round
+        """
+        identifiants, nombres = self.round_counts(Round)
+
+        return int(nombres.sum(dtype = np.int64))
+
+    def round_dict(self, Round):
+        """Donne les comptages d'un round sous forme de dictionnaire.
+
+        Parameters
+        ----------
+        Round : string
+            le nom du fichier fasta ou le nom du round
+
+        Returns
+        -------
+        compte: dictionnary
+            dictionnaire contenant le nombre d'occurrences de chaque
+            séquence de ce round, dans l'ordre des identifiants
+        """
+        identifiants, nombres = self.round_counts(Round)
+
+        return {self.catalogue.sequence(identifiant): nombre
+                for identifiant, nombre in zip(identifiants.tolist(), nombres.tolist())}
+
+    def total_counts(self, rounds = None):
+        """Donne le nombre d'occurrences de chaque séquence dans
+        l'ensemble des rounds.
+
+        Parameters
+        ----------
+        rounds : list
+            les rounds à additionner, tous les rounds s'il n'est pas
+            renseigné
+
+        Returns
+        -------
+        total: numpy.ndarray
+            tableau indexé par identifiant de séquence
+        """
+        total = np.zeros(len(self.catalogue), dtype = np.int64)
+
+        if rounds is None:
+            rounds = self.fichiers
+
+        for Round in rounds:
+            identifiants, nombres = self.round_counts(Round)
+            total[identifiants] += nombres
+
+        return total
+
+    def sequence_counts(self, seq):
+        """Donne le nombre d'occurrences d'une séquence à chaque round.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence recherchée
+
+        Returns
+        -------
+        compte: dictionnary
+            dictionnaire contenant pour chaque round le nombre
+            d'occurrences de la séquence
+        """
+        identifiant = self.catalogue.get_id(seq)
+        compte = {}
+
+        for ligne, Round in enumerate(self.rounds):
+            identifiants, nombres = self.round_counts(self.fichiers[ligne])
+            position = np.searchsorted(identifiants, identifiant) if identifiant is not None else len(identifiants)
+            if position < len(identifiants) and identifiants[position] == identifiant:
+                compte[Round] = int(nombres[position])
+            else:
+                compte[Round] = 0
+
+        return compte
+
+    def family_counts(self, identifiants_famille):
+        """Donne le nombre de lectures d'une famille à chaque round.
+
+        Parameters
+        ----------
+        identifiants_famille : iterable
+            les identifiants des séquences de la famille
+
+        Returns
+        -------
+        compte: dictionnary
+            dictionnaire contenant pour chaque round le nombre de lectures
+            appartenant à la famille
+        """
+        membres = np.fromiter(identifiants_famille, dtype = np.int64)
+        compte = {}
+
+        for ligne, Round in enumerate(self.rounds):
+            identifiants, nombres = self.round_counts(self.fichiers[ligne])
+            compte[Round] = int(nombres[np.isin(identifiants, membres)].sum(dtype = np.int64))
+
+        return compte
+
+    def save_families(self, fam_seq, fichiers):
+        """Sauvegarde des familles dans le dossier.
+
+        Parameters
+        ----------
+        fam_seq : dictionnary
+            dictionnaire contenant la liste des séquences de chaque
+            famille, toutes présentes dans le catalogue
+
+        fichiers: list
+            les rounds à partir desquels les familles ont été créées
+        """
+        indptr = [0]
+        indices = []
+
+        for seq_list in fam_seq.values():
+            indices.extend(self.catalogue.get_id(seq) for seq in seq_list)
+            indptr.append(len(indices))
+
+        np.save(os.path.join(self.dossier, "family_numbers.npy"), np.fromiter(fam_seq, dtype = np.int64, count = len(fam_seq)))
+        np.save(os.path.join(self.dossier, "family_indptr.npy"), np.array(indptr, dtype = np.int64))
+        np.save(os.path.join(self.dossier, "family_indices.npy"), np.array(indices, dtype = np.uint32))
+
+        with open(os.path.join(self.dossier, "family_rounds.txt"), "w") as filout:
+            for fichier in fichiers:
+                filout.write(f"{fichier}\n")
+
+    def families(self):
+        """Donne les familles sauvegardées avec save_families.
+
+        Returns
+        -------
+        familles: dictionnary
+            dictionnaire contenant pour chaque famille les identifiants de
+            ses séquences, la séquence de référence en premier
+
+        fichiers: list
+            les rounds à partir desquels les familles ont été créées
+        """
+        if not os.path.exists(os.path.join(self.dossier, "family_rounds.txt")):
+            sys.exit(f"Aucune famille n'est sauvegardée dans {self.dossier} (create_family.py --store)")
+
+        numeros = np.load(os.path.join(self.dossier, "family_numbers.npy"))
+        indptr = np.load(os.path.join(self.dossier, "family_indptr.npy"))
+        indices = np.load(os.path.join(self.dossier, "family_indices.npy"), mmap_mode = "r")
+
+        with open(os.path.join(self.dossier, "family_rounds.txt"), "r") as filin:
+            fichiers = [line.strip() for line in filin if line.strip()]
+
+        familles = {num_fam: indices[debut:fin] for num_fam, debut, fin in zip(numeros.tolist(), indptr[:-1].tolist(), indptr[1:].tolist())}
+
+        return familles, fichiers
+
+
+def main():
+    """Le main du programme."""
+
+    fichiers, dossier = arguments()
+    build_count_store(fichiers, dossier)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,137 +3,409 @@ fasta.
 
 Usage:
 ------
-    python3 create_family.py arguments
+    python3 create_family.py [options] arguments
 
     arguments: le ou les fichier.s fasta à analyser
+
+    options:
+        --bktree: recherche les séquences de chaque famille à l'aide
+        d'un BK-tree construit une seule fois au lieu de comparer la
+        séquence de référence à toutes les séquences restantes
+
+        --workers N: compte les fichiers fasta par blocs sur N processus,
+        et répartit la comparaison de la séquence de référence aux
+        séquences restantes sur N processus
+
+        --seuil N: nombre minimum d'occurrences d'une séquence pour
+        qu'elle soit conservée (1000 par défaut)
+
+        --heavy-hitters: trouve les séquences présentes au moins seuil
+        fois en mémoire bornée (count-min sketch puis comptage exact des
+        candidates) ; les familles sont alors créées à partir de ces
+        seules séquences ; un avertissement est affiché et les fichiers
+        Rxx_kept_data.txt et seq_sup_N_occ.txt commencent par une ligne
+        indiquant ce mode
+
+        --all-seq: écrit aussi les fichiers family_N_all_seq.txt contenant
+        chaque séquence autant de fois qu'elle apparait, en plus des
+        fichiers family_N_count_seq.txt (une séquence unique et son nombre
+        d'occurrences par ligne)
+
+        --store DOSSIER: lit les comptages dans le dossier écrit par
+        count_store.py au lieu de relire les fichiers fasta ; le dossier
+        est créé s'il n'existe pas, et les familles créées y sont aussi
+        sauvegardées
+
+        --ajout-round: ajoute le ou les nouveau.x round.s donné.s en
+        argument aux familles déjà créées dans le dossier courant
+        (seq_de_reference_pour_familles.txt et family_N_count_seq.txt) sans
+        relire les anciens rounds : les séquences déjà dans une famille y
+        sont comptées, les autres séquences rejoignent la première famille
+        dont la séquence de référence est à une distance inférieure ou
+        égale à la distance maximum, et les séquences restantes présentes
+        au moins seuil fois forment de nouvelles familles, dans la limite
+        du nombre de familles souhaité
+
+        --checkpoint N: sauvegarde l'état de la création des familles dans
+        checkpoint_familles.npz toutes les N familles, et à la fin
+
+        --checkpoint-secondes T: sauvegarde cet état au moins toutes les
+        T secondes
+
+        --resume: reprend la création des familles à partir de
+        checkpoint_familles.npz ; les familles obtenues sont identiques à
+        celles d'une exécution sans interruption
 """
 
 
 ############ Modules à importer ############
 
+import os
 import sys
+import ast
+import time
+import multiprocessing
+from functools import partial
 from tqdm import tqdm
-from Levenshtein import *
-import operator
-import copy
+from bounded_distance import distance_bornee
+from collections import Counter
+from bktree import BKTree
+from parallel_scan import ScanParallele
+from fasta_reader import read_fasta, count_sequences, round_name, read_family
+from heavy_hitters import heavy_hitters
+from count_store import CountStore, build_count_store
+from family_checkpoint import CHECKPOINT, order_digest, save_checkpoint, load_checkpoint
 
 ############################################
 
 
+EN_TETE_HEAVY_HITTERS = ("# mode --heavy-hitters : seules les séquences candidates du count-min sketch "
+                         "sont comptées, les familles ne regroupent pas toutes les séquences")
+
+
+def heavy_hitters_warning():
+    """Prévient que les familles créées avec --heavy-hitters ne regroupent
+    que les séquences candidates."""
+    print("Attention : avec --heavy-hitters, seules les séquences présentes au moins seuil fois sont "
+          "regroupées en familles ; les familles sont plus petites qu'avec un comptage complet",
+          file = sys.stderr)
+
+
 def arguments():
     """Vérifier le format et le nombre d'arguments renseigné.
 
     Returns
     -------
     fichiers: liste de tous les fichiers donnés en argument.
+
+    options: dictionnaire contenant les options renseignées en argument.
     """
 
     fichiers = []
+    options = {"bktree": False, "workers": 1, "seuil": 1000, "heavy_hitters": False, "all_seq": False, "store": None,
+               "ajout_round": False, "checkpoint": None, "checkpoint_secondes": None, "resume": False}
     
     if len(sys.argv) < 2:
         sys.exit("Veuillez renseigner au moins un fichier fasta à lire")
     
-    for index in range(1, len(sys.argv)):
-        if not sys.argv[index].endswith(".fas"):
-            sys.exit("Les fichiers renseignés doivent être au format fasta")
-        fichiers.append(str(sys.argv[index]))
+    index = 1
     
-    return fichiers
-
-
-def save_data(fichier):
-    """Lit un fichier fasta.
-
-    Parameters
-    ----------
-    fichier : string
-        fichier fasta à lire
+    while index < len(sys.argv):
+        if sys.argv[index] == "--bktree":
+            options["bktree"] = True
+        elif sys.argv[index] == "--workers":
+            index += 1
+            if index == len(sys.argv) or not sys.argv[index].isdigit() or int(sys.argv[index]) < 1:
+                sys.exit("L'option --workers doit être suivie d'un nombre de processus")
+            options["workers"] = int(sys.argv[index])
+        elif sys.argv[index] == "--seuil":
+            index += 1
+            if index == len(sys.argv) or not sys.argv[index].isdigit():
+                sys.exit("L'option --seuil doit être suivie d'un nombre d'occurrences")
+            options["seuil"] = int(sys.argv[index])
+        elif sys.argv[index] == "--heavy-hitters":
+            options["heavy_hitters"] = True
+        elif sys.argv[index] == "--all-seq":
+            options["all_seq"] = True
+        elif sys.argv[index] == "--ajout-round":
+            options["ajout_round"] = True
+        elif sys.argv[index] in ("--checkpoint", "--checkpoint-secondes"):
+            index += 1
+            if index == len(sys.argv) or not sys.argv[index].isdigit() or int(sys.argv[index]) < 1:
+                sys.exit(f"L'option {sys.argv[index - 1]} doit être suivie d'un nombre supérieur à 0")
+            options[sys.argv[index - 1][2:].replace("-", "_")] = int(sys.argv[index])
+        elif sys.argv[index] == "--resume":
+            options["resume"] = True
+        elif sys.argv[index] == "--store":
+            index += 1
+            if index == len(sys.argv):
+                sys.exit("L'option --store doit être suivie d'un nom de dossier")
+            options["store"] = sys.argv[index]
+        elif not sys.argv[index].endswith(".fas"):
+            sys.exit("Les fichiers renseignés doivent être au format fasta")
+        else:
+            fichiers.append(str(sys.argv[index]))
+        index += 1
 
-    Returns
-    -------
-    extracted_data: list
-        liste de tuple contenant le nom des séquences et les séquences.
-    """
-    
-    name_comments = []
-    sequence = []
-    extracted_data = []
+    if not fichiers:
+        sys.exit("Veuillez renseigner au moins un fichier fasta à lire")
 
-    with open(fichier, "r") as filin:
-        lines = filin.readlines()
-        for line in lines:
-            if line.startswith(">"):
-                name_comments.append(line.strip())
-            else:
-                sequence.append(line.strip())
-        extracted_data = [tuple(name_comments), tuple(sequence)]
+    if options["ajout_round"] and options["heavy_hitters"]:
+        sys.exit("L'option --heavy-hitters ne peut pas être utilisée avec --ajout-round")
     
-    return extracted_data
+    return fichiers, options
 
 
-def kept_all(extracted_all_data):
-    """lit une liste.
+def kept_all(compte, seuil = 1000):
+    """lit un dictionnaire de comptage.
 
     Parameters
     ----------
-    fichier : list
-        liste de toutes les séquences de tous les fichiers fastas
+    compte : dictionnary
+        dictionnaire de comptage contenant le nombre de fois où chaque
+        séquence apparait dans tous les fichiers fastas.
+
+    seuil: int
+        le nombre minimum d'occurrences
 
     Returns
     -------
     wanted_seq: dictionnary
         dictionnaire contenant toutes les séquences présentes à 
-        1000 occurrences ou plus.
+        seuil occurrences ou plus.
     
     compte: dictionnary
         dictionnaire de comptage contenant le nombre de fois où chaque
         séquence apparait dans tous les fichiers fastas.
     """    
 
-    compte = {}.fromkeys(set(extracted_all_data), 0)
-    
-    for seq in tqdm(extracted_all_data):
-        compte[seq] += 1
-
     wanted_seq = {}
     
     for cle, valeur in tqdm(compte.items()):
-        if valeur >= 1000:
+        if valeur >= seuil:
             wanted_seq[cle] = valeur
     
     return wanted_seq, compte
 
 
-def kept_data(extracted_data):
-    """lit une liste.
+def kept_data(compte, seuil = 1000):
+    """lit un dictionnaire de comptage.
+
+    Les séquences gardées sont triées par nombre d'occurrences décroissant,
+    puis par séquence en cas d'égalité : le fichier Rxx_kept_data.txt est
+    le même que les comptages viennent des fichiers fasta ou d'un dossier
+    écrit par count_store.py.
 
     Parameters
     ----------
-    fichier : list
-        liste de toutes les séquences d'un fichier fasta
+    compte : dictionnary
+        dictionnaire de comptage contenant le nombre de fois où chaque
+        séquence apparait dans un fichier fasta.
+
+    seuil: int
+        le nombre minimum d'occurrences
 
     Returns
     -------
     wanted_seq: dictionnary
         dictionnaire contenant toutes les séquences présentes à 
-        1000 occurrences ou plus.
+        seuil occurrences ou plus.
     """
 
-    compte = {}.fromkeys(set(extracted_data[1]), 0)
-    
-    for seq in tqdm(extracted_data[1]):
-        compte[seq] += 1
-
-    wanted_seq = {}
+    wanted_seq = []
     
     for cle, valeur in tqdm(compte.items()):
-        if valeur >= 1000:
-            wanted_seq[cle] = valeur
+        if valeur >= seuil:
+            wanted_seq.append((cle, valeur))
     
-    return wanted_seq
+    return dict(sorted(wanted_seq, key = lambda t: (-t[1], t[0])))
+
+
+def count_round(fichier, seuil = 1000):
+    """compte les séquences d'un fichier fasta.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier fasta à lire
+
+    seuil: int
+        le nombre minimum d'occurrences
+
+    Returns
+    -------
+    compte: dictionnary
+        dictionnaire de comptage contenant le nombre de fois où chaque
+        séquence apparait dans le fichier fasta.
+
+    wanted_seq: dictionnary
+        dictionnaire contenant toutes les séquences présentes à 
+        seuil occurrences ou plus dans le fichier fasta.
+    """
+
+    compte = count_sequences(read_fasta(fichier))
+    wanted_seq = kept_data(compte, seuil)
+
+    return compte, wanted_seq
+
+
+def count_block(fichiers, seuil = 1000, par_fichier = False):
+    """compte les séquences d'une suite de fichiers fasta et additionne
+    leurs comptages, dans l'ordre des fichiers.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta à lire
 
+    seuil: int
+        le nombre minimum d'occurrences
 
-def save_data_in_txt_file(data, fichier):
+    par_fichier: bool
+        si True, le dictionnaire de comptage de chaque fichier est aussi
+        renvoyé
+
+    Returns
+    -------
+    compte_bloc: dictionnary
+        dictionnaire de comptage contenant le nombre de fois où chaque
+        séquence apparait dans ces fichiers fastas.
+
+    wanted_par_fichier: dictionnary
+        dictionnaire contenant pour chaque fichier les séquences présentes à
+        seuil occurrences ou plus dans ce fichier.
+
+    comptes_par_fichier: dictionnary
+        dictionnaire contenant le dictionnaire de comptage de chaque
+        fichier, ou None si par_fichier est False
+    """
+
+    compte_bloc = Counter()
+    wanted_par_fichier = {}
+    comptes_par_fichier = {} if par_fichier else None
+
+    for fichier in fichiers:
+        compte, wanted_par_fichier[fichier] = count_round(fichier, seuil)
+        compte_bloc.update(compte)
+        if par_fichier:
+            comptes_par_fichier[fichier] = compte
+
+    return compte_bloc, wanted_par_fichier, comptes_par_fichier
+
+
+def count_rounds(fichiers, seuil = 1000, workers = 1, comptes_par_fichier = None):
+    """compte les séquences de tous les fichiers fasta.
+
+    Avec plusieurs processus, les fichiers sont répartis en blocs de
+    fichiers consécutifs, un par processus : chaque processus additionne
+    les comptages de son bloc dans l'ordre des fichiers, et seuls ces
+    comptages partiels sont renvoyés puis additionnés dans l'ordre des
+    blocs. L'ordre des séquences du dictionnaire final est donc le même
+    qu'avec un seul processus. Les comptages de chaque fichier ne sont
+    renvoyés que pour compléter comptes_par_fichier.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta à lire
+
+    seuil: int
+        le nombre minimum d'occurrences
+
+    workers: int
+        le nombre de processus
+
+    comptes_par_fichier: dictionnary
+        si renseigné, dictionnaire complété par le dictionnaire de comptage
+        de chaque fichier
+
+    Returns
+    -------
+    compte_all: dictionnary
+        dictionnaire de comptage contenant le nombre de fois où chaque
+        séquence apparait dans tous les fichiers fastas.
+
+    wanted_par_fichier: dictionnary
+        dictionnaire contenant pour chaque fichier les séquences présentes à
+        seuil occurrences ou plus dans ce fichier.
+    """
+
+    par_fichier = comptes_par_fichier is not None
+
+    if workers == 1 or len(fichiers) == 1:
+        compte_all, wanted_par_fichier, comptes = count_block(fichiers, seuil, par_fichier)
+        if par_fichier:
+            comptes_par_fichier.update(comptes)
+        return compte_all, wanted_par_fichier
+
+    workers = min(workers, len(fichiers))
+    blocs = [fichiers[k * len(fichiers) // workers:(k + 1) * len(fichiers) // workers] for k in range(workers)]
+    wanted_par_fichier = {}
+    compte_all = Counter()
+
+    with multiprocessing.Pool(workers) as pool:
+        for compte_bloc, wanted_bloc, comptes in pool.imap(partial(count_block, seuil = seuil, par_fichier = par_fichier), blocs):
+            compte_all.update(compte_bloc)
+            wanted_par_fichier.update(wanted_bloc)
+            if par_fichier:
+                comptes_par_fichier.update(comptes)
+            del compte_bloc
+
+    return compte_all, wanted_par_fichier
+
+
+def count_store_rounds(fichiers, dossier, seuil = 1000):
+    """lit les comptages de tous les fichiers fasta dans un dossier écrit
+    par count_store.py, ou crée ce dossier s'il n'existe pas.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta
+
+    dossier: string
+        le dossier contenant les comptages
+
+    seuil: int
+        le nombre minimum d'occurrences
+
+    Returns
+    -------
+    compte_all: dictionnary
+        dictionnaire de comptage contenant le nombre de fois où chaque
+        séquence apparait dans tous les fichiers fastas.
+
+    wanted_par_fichier: dictionnary
+        dictionnaire contenant pour chaque fichier les séquences présentes à
+        seuil occurrences ou plus dans ce fichier.
+    """
+
+    if os.path.exists(os.path.join(dossier, "rounds.txt")):
+        store = CountStore(dossier)
+        absents = [fichier for fichier in fichiers if fichier not in store.fichiers]
+        if absents:
+            sys.exit(f"Les fichiers {', '.join(absents)} ne sont pas comptés dans {dossier}")
+    else:
+        store = build_count_store(fichiers, dossier)
+
+    catalogue = store.catalogue
+    wanted_par_fichier = {}
+
+    for fichier in fichiers:
+        identifiants, nombres = store.round_counts(fichier)
+        garde = nombres >= seuil
+        wanted_par_fichier[fichier] = kept_data({catalogue.sequence(identifiant): nombre
+                                                 for identifiant, nombre in zip(identifiants[garde].tolist(), nombres[garde].tolist())},
+                                                seuil)
+
+    total = store.total_counts(fichiers)
+    compte_all = {catalogue.sequence(identifiant): nombre
+                  for identifiant, nombre in enumerate(total.tolist()) if nombre}
+
+    return compte_all, wanted_par_fichier
+
+
+def save_data_in_txt_file(data, fichier, en_tete = None):
     """sauvegarde un dictionnaire dans un fichier texte.
 
     Parameters
@@ -143,9 +415,14 @@ def save_data_in_txt_file(data, fichier):
 
     fichier: string
         le nom du fichier dans lequel les sauvegarder
+
+    en_tete: string
+        si renseignée, ligne écrite au début du fichier
     """
 
     with open(fichier, "w") as filout:
+        if en_tete is not None:
+            filout.write(f"{en_tete}\n")
         for cle, valeur in data.items():
             filout.write(f"{cle} {valeur}\n")
 
@@ -167,8 +444,28 @@ def save_one_key_dict_in_txt_file(data, fichier):
             filout.write(f"{seq}\n")
 
 
-def extract_max_in_dict(dictionnaire):
-    """donne le maximum d'un dictionnaire.
+def save_expanded_dict_in_txt_file(data, fichier):
+    """sauvegarde un dictionnaire de comptage dans un fichier texte,
+    en écrivant chaque séquence autant de fois qu'elle apparait.
+
+    Parameters
+    ----------
+    data : dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+
+    fichier: string
+        le nom du fichier dans lequel les sauvegarder
+    """
+    with open(fichier, "w") as filout:
+        for seq, nombre in data.items():
+            filout.write(f"{seq}\n" * nombre)
+
+
+def sort_by_count(dictionnaire):
+    """trie les clés d'un dictionnaire par valeur décroissante.
+
+    Les clés de même valeur restent dans l'ordre du dictionnaire, comme
+    avec max() : la première séquence la plus fréquente est choisie.
 
     Parameters
     ----------
@@ -178,26 +475,23 @@ def extract_max_in_dict(dictionnaire):
     returns
     -------
 
-    number_seq_max : int
-        la valeur maximale du dictionnaire
-    
-    seq_max : string
-        la séquence associée à cette valeur maximale
+    ordre : list
+        liste des clés du dictionnaire triées par valeur décroissante
     """
-    number_seq_max = max(dictionnaire.items(), key = operator.itemgetter(1))[1]
-    seq_max = max(dictionnaire.items(), key = operator.itemgetter(1))[0]
+    ordre = sorted(dictionnaire, key = dictionnaire.__getitem__, reverse = True)
     
-    return number_seq_max, seq_max
+    return ordre
 
 
-def create_families(compte_all, nombre_famille, dist_max):
+def create_families(compte_all, nombre_famille, dist_max, bktree = False, workers = 1, checkpoint = None):
     """créer des familles de séquences.
 
     Parameters
     ----------
     compte_all : dictionnary
         un dictionnaire contenant le nombre d'occurences de
-        chaque séquences au sein de tous les fichiers fastas
+        chaque séquences au sein de tous les fichiers fastas.
+        Il n'est pas modifié.
 
     nombre_famille: int
         le nombre de famille voulu
@@ -207,6 +501,23 @@ def create_families(compte_all, nombre_famille, dist_max):
         pour qu'elles soient considéré comme faisant parti de la
         même famille
 
+    bktree: bool
+        si True, les séquences proches de la séquence de référence
+        sont recherchées dans un BK-tree au lieu d'être comparées
+        une à une. Les familles obtenues sont identiques.
+
+    workers: int
+        si supérieur à 1, la comparaison des séquences restantes à la
+        séquence de référence est répartie sur ce nombre de processus.
+        Les familles obtenues sont identiques.
+
+    checkpoint: dictionnary
+        si renseigné, dictionnaire contenant le fichier de sauvegarde de
+        l'état ("fichier"), le nombre de familles ("familles") et le
+        nombre de secondes ("secondes") entre deux sauvegardes (None pour
+        ne pas en tenir compte), et si la création reprend à partir de ce
+        fichier ("reprise"). L'état est aussi sauvegardé à la fin.
+
     returns
     -------
 
@@ -220,10 +531,11 @@ def create_families(compte_all, nombre_famille, dist_max):
         avec en clé la séquence et en valeur associée
         le numéro de famille.
     
-    fam_seq_complete: dictionnary
+    fam_seq_compte: dictionnary
         dictionnaire contenant les familles de séquences,
         avec en clé le numéro de famille et en valeur associée
-        la liste des séquences totales présentes dans cette famille.
+        un dictionnaire contenant le nombre d'occurrences de chaque
+        séquence de cette famille.
 
     seq_ref: dictionnary
         dictionnaire contenant la séquence de référence pour chaque famille
@@ -231,45 +543,306 @@ def create_families(compte_all, nombre_famille, dist_max):
     """    
     fam_seq = {}
     seq_fam = {}
-    fam_seq_complete = {}
+    fam_seq_compte = {}
     seq_ref = {}
     num_famille = 0
-    dict_miroir = copy.deepcopy(dictionnaire)
+    vivantes = set(compte_all)
+    ordre = sort_by_count(compte_all)
+    position = 0
+    index = None
+
+    if checkpoint is not None:
+        empreinte = order_digest(ordre)
+        derniere_sauvegarde = time.monotonic()
+
+    if checkpoint is not None and checkpoint["reprise"]:
+        fam_reprise, seq_fam_reprise, position_reprise = load_checkpoint(checkpoint["fichier"], ordre, compte_all, dist_max, empreinte)
+        if fam_reprise is not None:
+            if len(fam_reprise) > nombre_famille:
+                sys.exit(f"Le point de reprise contient déjà {len(fam_reprise)} familles")
+            seq_fam = seq_fam_reprise
+            vivantes.difference_update(seq_fam)
+            position = position_reprise
+            for num_famille, seq_list in fam_reprise.items():
+                fam_seq[num_famille] = seq_list
+                fam_seq_compte[num_famille] = {seq: compte_all[seq] for seq in seq_list}
+                seq_ref[num_famille] = [(seq_list[0]), (compte_all[seq_list[0]])]
+            num_famille = max(fam_seq, default = 0)
+
+    if bktree:
+        index = BKTree(seq for seq in compte_all if seq in vivantes)
+    elif workers > 1:
+        index = ScanParallele([seq for seq in compte_all if seq in vivantes], workers)
     
-    while dict_miroir:
+    try:
+        while vivantes:
 
-        if len(fam_seq) == nombre_famille:
-            break
-        
-        number_seq_max, seq_max = extract_max_in_dict(dictionnaire)
-        num_famille += 1
-        fam_seq[num_famille] = []
-        fam_seq_complete[num_famille] = []
-        fam_seq[num_famille].append(seq_max)
-        tmp = seq_max.split()
-        fam_seq_complete[num_famille] += tmp * number_seq_max
-        seq_fam[seq_max] = num_famille
-        seq_ref[num_famille] = [(seq_max), (number_seq_max)]
-        dictionnaire.pop(seq_max)
-        dict_miroir.pop(seq_max)
-        print(num_famille)
-
-        for cle, valeur in tqdm(dictionnaire.items()):
-            if (cle, valeur) in dict_miroir.items():
-                diff = distance(cle, seq_max)
-                if diff <= dist_max:
-                    fam_seq[num_famille].append(cle)
-                    seq_fam[cle] = num_famille
-                    tmp = []
-                    tmp.append(cle)
-                    fam_seq_complete[num_famille] += tmp * valeur
-                    dict_miroir.pop(cle)
+            if len(fam_seq) == nombre_famille:
+                break
         
-        for seq in tqdm(fam_seq[num_famille]):
-            if seq in dictionnaire:
-                dictionnaire.pop(seq)
+            while ordre[position] not in vivantes:
+                position += 1
+            seq_max = ordre[position]
+            number_seq_max = compte_all[seq_max]
+            num_famille += 1
+            fam_seq[num_famille] = []
+            fam_seq_compte[num_famille] = {}
+            fam_seq[num_famille].append(seq_max)
+            fam_seq_compte[num_famille][seq_max] = number_seq_max
+            seq_fam[seq_max] = num_famille
+            seq_ref[num_famille] = [(seq_max), (number_seq_max)]
+            vivantes.remove(seq_max)
+            print(num_famille)
+
+            if index is None:
+                candidats = [cle for cle in tqdm(compte_all)
+                             if cle in vivantes and distance_bornee(cle, seq_max, dist_max) <= dist_max]
+            else:
+                index.retirer(seq_max)
+                candidats = index.voisins(seq_max, dist_max)
+
+            for cle in candidats:
+                fam_seq[num_famille].append(cle)
+                seq_fam[cle] = num_famille
+                fam_seq_compte[num_famille][cle] = compte_all[cle]
+                vivantes.remove(cle)
+                if index is not None:
+                    index.retirer(cle)
+
+            if checkpoint is not None:
+                par_familles = checkpoint["familles"] is not None and len(fam_seq) % checkpoint["familles"] == 0
+                par_temps = checkpoint["secondes"] is not None and time.monotonic() - derniere_sauvegarde >= checkpoint["secondes"]
+                if par_familles or par_temps:
+                    save_checkpoint(checkpoint["fichier"], ordre, fam_seq, seq_fam, position, dist_max, empreinte)
+                    derniere_sauvegarde = time.monotonic()
+
+        if checkpoint is not None:
+            save_checkpoint(checkpoint["fichier"], ordre, fam_seq, seq_fam, position, dist_max, empreinte)
+    finally:
+        if isinstance(index, ScanParallele):
+            index.fermer()
     
-    return fam_seq, seq_fam, fam_seq_complete, seq_ref
+    return fam_seq, seq_fam, fam_seq_compte, seq_ref
+
+
+def read_seq_ref(fichier):
+    """Lit le fichier des séquences de référence écrit par create_family.py.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier seq_de_reference_pour_familles.txt
+
+    Returns
+    -------
+    seq_ref: dictionnary
+        dictionnaire contenant la séquence de référence pour chaque famille
+        ainsi que le nombre de fois où elle apparait dans la famille.
+    """
+    seq_ref = {}
+
+    with open(fichier, "r") as filin:
+        for line in filin:
+            champs = line.split(maxsplit = 1)
+            if champs:
+                seq_ref[int(champs[0])] = list(ast.literal_eval(champs[1]))
+
+    return seq_ref
+
+
+def read_families(seq_ref):
+    """Lit les fichiers des familles du dossier courant.
+
+    Parameters
+    ----------
+    seq_ref : dictionnary
+        dictionnaire renvoyé par read_seq_ref
+
+    Returns
+    -------
+    fam_seq, seq_fam, fam_seq_compte, seq_ref: dictionnary
+        les dictionnaires renvoyés par create_families
+    """
+    fam_seq = {}
+    seq_fam = {}
+    fam_seq_compte = {}
+
+    for num_famille in sorted(seq_ref):
+        fichier = f"family_{num_famille}_count_seq.txt"
+        if not os.path.exists(fichier):
+            fichier = f"family_{num_famille}_all_seq.txt"
+        if not os.path.exists(fichier):
+            sys.exit(f"Le fichier family_{num_famille}_count_seq.txt est introuvable")
+        fam_seq_compte[num_famille] = dict(read_family(fichier))
+        fam_seq[num_famille] = list(fam_seq_compte[num_famille])
+        for seq in fam_seq[num_famille]:
+            seq_fam[seq] = num_famille
+
+    return fam_seq, seq_fam, fam_seq_compte, seq_ref
+
+
+def add_rounds_to_families(familles, compte_new, nombre_famille, dist_max, seuil = 1000, bktree = False, workers = 1):
+    """ajoute les séquences de nouveaux rounds à des familles existantes.
+
+    Les séquences déjà présentes dans une famille y sont comptées. Les
+    autres séquences rejoignent la première famille dont la séquence de
+    référence est à une distance inférieure ou égale à dist_max, comme
+    dans create_families. Les séquences restantes présentes au moins seuil
+    fois forment de nouvelles familles (create_families), numérotées à la
+    suite des familles existantes, jusqu'à nombre_famille familles au
+    total.
+
+    Parameters
+    ----------
+    familles : tuple
+        les dictionnaires renvoyés par read_families, complétés et
+        renvoyés
+
+    compte_new: dictionnary
+        dictionnaire de comptage des séquences des nouveaux rounds
+
+    nombre_famille: int
+        le nombre de familles voulu au total
+
+    dist_max: int
+        la distance de Levenshtein maximum à la séquence de référence
+
+    seuil: int
+        le nombre minimum d'occurrences dans les nouveaux rounds d'une
+        séquence proche d'aucune famille pour qu'elle puisse former une
+        nouvelle famille
+
+    bktree, workers:
+        les paramètres de create_families pour les nouvelles familles
+
+    returns
+    -------
+    fam_seq, seq_fam, fam_seq_compte, seq_ref: dictionnary
+        les dictionnaires de create_families, pour toutes les familles
+    """
+    fam_seq, seq_fam, fam_seq_compte, seq_ref = familles
+    graines = {seq_ref[num_famille][0]: num_famille for num_famille in sorted(seq_ref)}
+    arbre = BKTree(graines)
+    orphelines = {}
+
+    for seq, nombre in tqdm(compte_new.items()):
+        if seq in seq_fam:
+            fam_seq_compte[seq_fam[seq]][seq] += nombre
+            continue
+        proches = arbre.voisins(seq, dist_max)
+        if proches:
+            num_famille = graines[proches[0]]
+            fam_seq[num_famille].append(seq)
+            fam_seq_compte[num_famille][seq] = nombre
+            seq_fam[seq] = num_famille
+        elif nombre >= seuil:
+            orphelines[seq] = nombre
+
+    for num_famille, ref in seq_ref.items():
+        ref[1] = fam_seq_compte[num_famille][ref[0]]
+
+    nouvelles = nombre_famille - len(fam_seq)
+
+    if orphelines and nouvelles > 0:
+        decalage = max(fam_seq, default = 0)
+        new_fam_seq, new_seq_fam, new_fam_seq_compte, new_seq_ref = create_families(orphelines, nouvelles, dist_max, bktree, workers)
+        for num_famille in new_fam_seq:
+            fam_seq[num_famille + decalage] = new_fam_seq[num_famille]
+            fam_seq_compte[num_famille + decalage] = new_fam_seq_compte[num_famille]
+            seq_ref[num_famille + decalage] = new_seq_ref[num_famille]
+        for seq, num_famille in new_seq_fam.items():
+            seq_fam[seq] = num_famille + decalage
+
+    return fam_seq, seq_fam, fam_seq_compte, seq_ref
+
+
+def read_rounds(fichier):
+    """Lit la liste des rounds déjà comptés dans les familles.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier rounds_des_familles.txt
+
+    Returns
+    -------
+    rounds: list
+        la liste des rounds, vide si le fichier n'existe pas
+    """
+    if not os.path.exists(fichier):
+        return []
+
+    with open(fichier, "r") as filin:
+        return [line.strip() for line in filin if line.strip()]
+
+
+def save_families(fam_seq, fam_seq_compte, seq_ref, all_seq = False):
+    """sauvegarde les familles et leurs séquences de référence.
+
+    Parameters
+    ----------
+    fam_seq, fam_seq_compte, seq_ref: dictionnary
+        les dictionnaires renvoyés par create_families
+
+    all_seq: bool
+        si True, écrit aussi les fichiers family_N_all_seq.txt
+    """
+    save_seq_ref = "seq_de_reference_pour_familles.txt"
+    save_data_in_txt_file(seq_ref, save_seq_ref)
+
+    for cle, valeur in fam_seq.items():
+        save_by_family_diff_seq = f"family_{cle}_diff_seq.txt"
+        save_one_key_dict_in_txt_file(fam_seq[cle], save_by_family_diff_seq)
+    
+    for cle, valeur in fam_seq_compte.items():
+        save_by_family_count_seq = f"family_{cle}_count_seq.txt"
+        save_data_in_txt_file(fam_seq_compte[cle], save_by_family_count_seq)
+        if all_seq:
+            save_by_family_all_seq = f"family_{cle}_all_seq.txt"
+            save_expanded_dict_in_txt_file(fam_seq_compte[cle], save_by_family_all_seq)
+
+
+def add_rounds(fichiers, options, dist_max, nombre_famille):
+    """ajoute de nouveaux rounds aux familles du dossier courant et
+    sauvegarde les familles mises à jour.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta des nouveaux rounds
+
+    options: dictionnary
+        les options renvoyées par arguments
+
+    dist_max: int
+        la distance de Levenshtein maximum
+
+    nombre_famille: int
+        le nombre de familles voulu au total
+    """
+    rounds_file = "rounds_des_familles.txt"
+    rounds = read_rounds(rounds_file)
+    deja_comptes = [round_name(fichier) for fichier in fichiers if round_name(fichier) in rounds]
+
+    if deja_comptes:
+        sys.exit(f"Les rounds {', '.join(deja_comptes)} sont déjà comptés dans les familles")
+
+    familles = read_families(read_seq_ref("seq_de_reference_pour_familles.txt"))
+    seuil = options["seuil"]
+
+    if options["store"] is not None:
+        compte_new, wanted_par_fichier = count_store_rounds(fichiers, options["store"], seuil)
+    else:
+        compte_new, wanted_par_fichier = count_rounds(fichiers, seuil, options["workers"])
+
+    for fichier in fichiers:
+        seq_kept = round_name(fichier) + "_kept_data.txt"
+        save_data_in_txt_file(wanted_par_fichier[fichier], seq_kept)
+
+    fam_seq, seq_fam, fam_seq_compte, seq_ref = add_rounds_to_families(familles, compte_new, nombre_famille, dist_max, seuil,
+                                                                       options["bktree"], options["workers"])
+    save_families(fam_seq, fam_seq_compte, seq_ref, options["all_seq"])
+    save_one_key_dict_in_txt_file(rounds + [round_name(fichier) for fichier in fichiers], rounds_file)
 
 ############################################
 
@@ -338,35 +911,51 @@ def main():
     dist_max = int(input("Quelle est la distance de Levenshtein maximum entre deux séquences pour former une famille ? "))
     nombre_famille = int(input("Quel est le nombre de famille souhaité ? "))
     
-    extracted_all_data_dict = {}
-    extracted_all_data_list = []
-    fichiers = arguments()
-    
-    for fichier in fichiers:
-        extracted_data = save_data(fichier)
-        wanted_seq = kept_data(extracted_data)
-        extracted_all_data_dict[fichier[0:3]] = list(extracted_data[1])
-        extracted_all_data_list = extracted_all_data_list + list(extracted_data[1])
-        seq_kept = fichier.strip(".fastq_result.fas") + "_kept_data.txt"
-        save_data_in_txt_file(wanted_seq, seq_kept)
+    fichiers, options = arguments()
+    seuil = options["seuil"]
+
+    if options["ajout_round"]:
+        add_rounds(fichiers, options, dist_max, nombre_famille)
+        return
     
-    wanted_seq_all, compte_all = kept_all(extracted_all_data_list)
-    fam_seq, seq_fam, fam_seq_complete, seq_ref = create_families(compte_all, nombre_famille, dist_max)
+    en_tete = None
 
-    save_seq_ref = "seq_de_reference_pour_familles.txt"
-    save_data_in_txt_file(seq_ref, save_seq_ref)
+    if options["heavy_hitters"]:
+        heavy_hitters_warning()
+        en_tete = EN_TETE_HEAVY_HITTERS
+        wanted_seq_all, compte_par_fichier = heavy_hitters(fichiers, seuil)
+        wanted_par_fichier = {}
+        for fichier in fichiers:
+            wanted_par_fichier[fichier] = kept_data(compte_par_fichier.pop(fichier), seuil)
+        compte_all = wanted_seq_all
 
-    for cle, valeur in fam_seq.items():
-        save_by_family_diff_seq = f"family_{cle}_diff_seq.txt"
-        save_one_key_dict_in_txt_file(fam_seq[cle], save_by_family_diff_seq)
+    elif options["store"] is not None:
+        compte_all, wanted_par_fichier = count_store_rounds(fichiers, options["store"], seuil)
+        wanted_seq_all, compte_all = kept_all(compte_all, seuil)
+
+    else:
+        compte_all, wanted_par_fichier = count_rounds(fichiers, seuil, options["workers"])
+        wanted_seq_all, compte_all = kept_all(compte_all, seuil)
+
+    for fichier in fichiers:
+        seq_kept = round_name(fichier) + "_kept_data.txt"
+        save_data_in_txt_file(wanted_par_fichier[fichier], seq_kept, en_tete)
     
-    for cle, valeur in fam_seq_complete.items():
-        save_by_family_all_seq = f"family_{cle}_all_seq.txt"
-        save_one_key_dict_in_txt_file(fam_seq_complete[cle], save_by_family_all_seq)
+    checkpoint = None
+    if options["checkpoint"] is not None or options["checkpoint_secondes"] is not None or options["resume"]:
+        checkpoint = {"fichier": CHECKPOINT, "familles": options["checkpoint"],
+                      "secondes": options["checkpoint_secondes"], "reprise": options["resume"]}
+
+    fam_seq, seq_fam, fam_seq_compte, seq_ref = create_families(compte_all, nombre_famille, dist_max, options["bktree"],
+                                                                options["workers"], checkpoint)
 
+    save_families(fam_seq, fam_seq_compte, seq_ref, options["all_seq"])
+    save_one_key_dict_in_txt_file([round_name(fichier) for fichier in fichiers], "rounds_des_familles.txt")
+    if options["store"] is not None:
+        CountStore(options["store"]).save_families(fam_seq, fichiers)
 
-    seq_kept_all = "seq_sup_1000_occ.txt"
-    save_data_in_txt_file(wanted_seq_all, seq_kept_all)
+    seq_kept_all = f"seq_sup_{seuil}_occ.txt"
+    save_data_in_txt_file(wanted_seq_all, seq_kept_all, en_tete)
 
 
 #    nbr_seq_eq, nbr_seq_diff = count_diff_and_common_seq_in_files(extracted_all_data_dict)
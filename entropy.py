@@ -2,9 +2,33 @@
 
 Usage:
 ------
-    python3 entropy.py arguments
+    python3 entropy.py [options] arguments
 
-    arguments: le ou les fichier.s texte à analyser
+    arguments: le ou les fichier.s texte à analyser, au format
+    family_N_all_seq.txt (une séquence par ligne) ou family_N_count_seq.txt
+    (une séquence unique et son nombre d'occurrences par ligne)
+
+    options:
+        --batch: calcule l'entropie de toutes les familles en une seule
+        fois à partir d'un tableau numpy contenant les comptages de toutes
+        les familles ; le nombre de séquences uniques de chaque famille
+        est calculé directement, sans lire taille_des_familles.txt
+
+        --rarefy N: calcule aussi l'entropie de chaque famille sur des
+        sous-échantillons de N séquences tirés au hasard (tirage
+        multinomial selon la fréquence de chaque séquence), pour comparer
+        des familles de tailles différentes ; la moyenne et l'intervalle de
+        confiance à 95 % sont écrits dans shannon_entropy_rarefy_N.txt
+
+        --replicates R: le nombre de sous-échantillons par famille (100 par
+        défaut)
+
+        --random-seed S: la graine du générateur aléatoire (0 par défaut)
+
+        --store DOSSIER: lit les familles et le nombre d'occurrences de
+        leurs séquences dans le dossier écrit par count_store.py et
+        create_family.py --store, sans lire de fichier de famille ;
+        l'entropie est alors calculée comme avec --batch
 """
 
 
@@ -14,6 +38,9 @@ Usage:
 import sys
 from tqdm import tqdm
 import math
+import numpy as np
+from fasta_reader import read_lines, read_counts, is_count_file, count_sequences, family_number
+from count_store import CountStore
 
 
 ############################################
@@ -24,19 +51,43 @@ def arguments():
     Returns
     -------
     fichiers: liste de tous les fichiers donnés en argument
+
+    options: dictionnaire contenant les options renseignées en argument
     """
 
     fichiers = []
+    options = {"batch": False, "rarefy": None, "replicates": 100, "random_seed": 0, "store": None}
+    valeurs = {"--rarefy": "rarefy", "--replicates": "replicates", "--random-seed": "random_seed"}
     
     if len(sys.argv) < 2:
         sys.exit("Veuillez renseigner au moins un fichier txt à lire")
     
-    for index in range(1, len(sys.argv)):
-        if not sys.argv[index].endswith(".txt"):
+    index = 1
+
+    while index < len(sys.argv):
+        if sys.argv[index] == "--batch":
+            options["batch"] = True
+        elif sys.argv[index] in valeurs:
+            option = sys.argv[index]
+            index += 1
+            if index == len(sys.argv) or not sys.argv[index].isdigit() or (int(sys.argv[index]) < 1 and option != "--random-seed"):
+                sys.exit(f"L'option {option} doit être suivie d'un nombre entier positif")
+            options[valeurs[option]] = int(sys.argv[index])
+        elif sys.argv[index] == "--store":
+            index += 1
+            if index == len(sys.argv):
+                sys.exit("L'option --store doit être suivie d'un nom de dossier")
+            options["store"] = sys.argv[index]
+        elif not sys.argv[index].endswith(".txt"):
             sys.exit("Les fichiers renseignés doivent être au format txt")
-        fichiers.append(str(sys.argv[index]))
+        else:
+            fichiers.append(str(sys.argv[index]))
+        index += 1
+
+    if not fichiers and options["store"] is None:
+        sys.exit("Veuillez renseigner au moins un fichier txt à lire")
     
-    return fichiers
+    return fichiers, options
 
 
 def save_data(fichier):
@@ -49,31 +100,34 @@ def save_data(fichier):
 
     Returns
     -------
-    sequence: list
-        liste de des séquences présentes dans cette famille
+    compte: dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+        de la famille
     taille_famille : int
         la taille de la famille
     """ 
-    sequence = []
-    taille_famille = 0
-    
-    with open(fichier, "r") as filin:
-        lines = filin.readlines()
-        taille_famille = len(lines)
-        for line in lines:
-            sequence.append(line.strip())
+    if is_count_file(fichier):
+        compte = compte_seq(read_counts(fichier), weighted = True)
+    else:
+        compte = compte_seq(read_lines(fichier))
+    taille_famille = sum(compte.values())
     
-    return sequence, taille_famille
+    return compte, taille_famille
 
 
-def compte_seq(sequence):
+def compte_seq(sequence, weighted = False):
     """compte le nombre d'occurrences de chaque séquence
     dans la liste de séquences.
 
     Parameters
     ----------
-    sequence: list
-        liste des séquences de la famille
+    sequence: iterable
+        les séquences de la famille, ou des tuples (séquence, nombre
+        d'occurrences) si weighted est True
+
+    weighted: bool
+        si True, chaque séquence est accompagnée de son nombre
+        d'occurrences (fichiers family_N_count_seq.txt)
 
     Returns
     -------
@@ -82,10 +136,13 @@ def compte_seq(sequence):
         de la liste renseignée en argument
     """ 
 
-    compte = {}.fromkeys(set(sequence), 0)
+    if not weighted:
+        return count_sequences(tqdm(sequence))
+
+    compte = {}
 
-    for seq in tqdm(sequence):
-        compte[seq] += 1
+    for seq, nombre in tqdm(sequence):
+        compte[seq] = compte.get(seq, 0) + nombre
 
     return compte
 
@@ -136,7 +193,7 @@ def calc_shannon_entropy(frequence, fichier, taille_seq_uniques):
         entropy de Shannon pour la famille testée
     """ 
 
-    cle = int(fichier.strip("family__all_seq.txt"))
+    cle = family_number(fichier)
     base = taille_seq_uniques[cle]
     entropy = 0
     
@@ -146,6 +203,293 @@ def calc_shannon_entropy(frequence, fichier, taille_seq_uniques):
     return entropy
 
 
+def create_count_table(fichiers):
+    """rassemble les comptages de toutes les familles dans un seul tableau.
+
+    Parameters
+    ----------
+    fichiers: list
+        liste des fichiers de familles
+
+    Returns
+    -------
+    les mêmes valeurs que count_table
+    """
+    comptes = {}
+
+    for fichier in fichiers:
+        compte, taille_famille = save_data(fichier)
+        comptes[family_number(fichier)] = compte
+
+    return count_table(comptes)
+
+
+def store_count_table(dossier):
+    """rassemble dans un seul tableau les comptages des familles
+    sauvegardées dans un dossier de comptages.
+
+    Le nombre d'occurrences de chaque séquence est la somme de ses
+    comptages dans les rounds à partir desquels les familles ont été
+    créées, comme dans les fichiers family_N_count_seq.txt.
+
+    Parameters
+    ----------
+    dossier: string
+        le dossier écrit par count_store.py et create_family.py --store
+
+    Returns
+    -------
+    les mêmes valeurs que count_table
+    """
+    store = CountStore(dossier)
+    familles, fichiers = store.families()
+    total = store.total_counts(fichiers)
+    comptes = {}
+
+    for num_fam, identifiants in familles.items():
+        comptes[num_fam] = {store.catalogue.sequence(identifiant): nombre
+                            for identifiant, nombre in zip(identifiants.tolist(), total[identifiants].tolist())}
+
+    return count_table(comptes)
+
+
+def count_table(comptes):
+    """rassemble des dictionnaires de comptage dans un seul tableau.
+
+    Parameters
+    ----------
+    comptes: dictionnary
+        dictionnaire contenant pour chaque famille le nombre d'occurrences
+        de chacune de ses séquences
+
+    Returns
+    -------
+    familles: list
+        liste des numéros de famille, sans les familles vides
+
+    sequences: list
+        liste des séquences de toutes les familles, famille par famille
+
+    nombres: numpy.ndarray
+        le nombre d'occurrences de chaque séquence de sequences
+
+    debuts: numpy.ndarray
+        la position de la première séquence de chaque famille dans nombres
+    """
+    familles = []
+    sequences = []
+    nombres = []
+    debuts = []
+
+    for num_fam, compte in comptes.items():
+        if not compte:
+            continue
+        familles.append(num_fam)
+        debuts.append(len(sequences))
+        sequences.extend(compte.keys())
+        nombres.extend(compte.values())
+
+    return familles, sequences, np.array(nombres, dtype = np.int64), np.array(debuts, dtype = np.int64)
+
+
+def calc_all_shannon_entropy(nombres, debuts):
+    """calcule l'entropie de Shannon de toutes les familles en une seule
+    fois.
+
+    Le logarithme de chaque famille est calculé dans la base égale à son
+    nombre de séquences uniques ; l'entropie d'une famille ne contenant
+    qu'une séquence unique vaut 0.
+
+    Parameters
+    ----------
+    nombres: numpy.ndarray
+        le nombre d'occurrences de chaque séquence, famille par famille
+
+    debuts: numpy.ndarray
+        la position de la première séquence de chaque famille dans nombres
+
+    Returns
+    -------
+    entropies: numpy.ndarray
+        l'entropie de Shannon de chaque famille
+
+    frequences: numpy.ndarray
+        la fréquence de chaque séquence dans sa famille
+
+    uniques: numpy.ndarray
+        le nombre de séquences uniques de chaque famille
+    """
+    uniques = np.diff(np.append(debuts, len(nombres)))
+    tailles = np.add.reduceat(nombres, debuts)
+    frequences = nombres / np.repeat(tailles, uniques)
+
+    termes = - frequences * np.log(frequences)
+    sommes = np.add.reduceat(termes, debuts)
+    bases = np.log(uniques)
+    entropies = np.divide(sommes, bases, out = np.zeros_like(sommes), where = uniques > 1)
+
+    return entropies, frequences, uniques
+
+
+def save_sorted_table(sequences, valeurs, ordre, fichier):
+    """sauvegarde les valeurs d'une famille dans un fichier texte, dans
+    l'ordre donné.
+
+    Parameters
+    ----------
+    sequences: list
+        les séquences de la famille
+
+    valeurs: list
+        la valeur associée à chaque séquence
+
+    ordre: list
+        l'ordre dans lequel écrire les séquences
+
+    fichier: string
+        le nom du fichier dans lequel les sauvegarder
+    """
+    with open(fichier, "w") as filout:
+        for i in ordre:
+            filout.write(f"{sequences[i]} {valeurs[i]}\n")
+
+
+def batch_entropy(familles, sequences, nombres, debuts):
+    """calcule l'entropie de toutes les familles et sauvegarde les tables
+    de fréquence et de comptage de chaque famille.
+
+    Parameters
+    ----------
+    familles: list
+        liste des numéros de famille
+
+    sequences: list
+        liste des séquences de toutes les familles, famille par famille
+
+    nombres: numpy.ndarray
+        le nombre d'occurrences de chaque séquence de sequences
+
+    debuts: numpy.ndarray
+        la position de la première séquence de chaque famille dans nombres
+
+    Returns
+    -------
+    entropy_dict: dictionnary
+        dictionnaire contenant l'entropie de Shannon de chaque famille
+    """
+
+    if not familles:
+        return {}
+
+    entropies, frequences, uniques = calc_all_shannon_entropy(nombres, debuts)
+    entropy_dict = dict(zip(familles, entropies.tolist()))
+
+    for num_fam, debut, taille in zip(familles, debuts.tolist(), uniques.tolist()):
+        fin = debut + taille
+        ordre = np.argsort(- nombres[debut:fin], kind = "stable").tolist()
+        seq_famille = sequences[debut:fin]
+        freq = "frequence_par_seq_famille_{}_all_seq.txt".format(num_fam)
+        save_sorted_table(seq_famille, frequences[debut:fin].tolist(), ordre, freq)
+        compte_par_famille = "nbr_occ_seq_famille_{}.txt".format(num_fam)
+        save_sorted_table(seq_famille, nombres[debut:fin].tolist(), ordre, compte_par_famille)
+
+    return entropy_dict
+
+
+def rarefy_entropy(nombres, debuts, profondeur, repetitions = 100, graine = 0):
+    """calcule l'entropie de Shannon de chaque famille sur des
+    sous-échantillons de même taille.
+
+    Pour chaque famille, repetitions sous-échantillons de profondeur
+    séquences sont tirés selon la fréquence de chaque séquence (tirage
+    multinomial). Comme pour calc_shannon_entropy, le logarithme est
+    calculé dans la base égale au nombre de séquences uniques de la
+    famille complète.
+
+    Parameters
+    ----------
+    nombres: numpy.ndarray
+        le nombre d'occurrences de chaque séquence, famille par famille
+
+    debuts: numpy.ndarray
+        la position de la première séquence de chaque famille dans nombres
+
+    profondeur: int
+        le nombre de séquences de chaque sous-échantillon
+
+    repetitions: int
+        le nombre de sous-échantillons par famille
+
+    graine: int
+        la graine du générateur aléatoire
+
+    Returns
+    -------
+    moyennes: numpy.ndarray
+        l'entropie moyenne de chaque famille, nan pour les familles de
+        moins de profondeur séquences
+
+    bas: numpy.ndarray
+        la borne inférieure de l'intervalle de confiance à 95 %
+
+    hauts: numpy.ndarray
+        la borne supérieure de l'intervalle de confiance à 95 %
+    """
+    generateur = np.random.default_rng(graine)
+    uniques = np.diff(np.append(debuts, len(nombres)))
+    tailles = np.add.reduceat(nombres, debuts)
+    moyennes = np.full(len(debuts), np.nan)
+    bas = np.full(len(debuts), np.nan)
+    hauts = np.full(len(debuts), np.nan)
+
+    for i, (debut, taille) in enumerate(zip(debuts.tolist(), uniques.tolist())):
+        if tailles[i] < profondeur:
+            continue
+        if taille == 1:
+            moyennes[i] = bas[i] = hauts[i] = 0.0
+            continue
+
+        tirages = generateur.multinomial(profondeur, nombres[debut:debut + taille] / tailles[i], size = repetitions)
+        frequences = tirages / profondeur
+        termes = np.zeros_like(frequences)
+        np.multiply(frequences, np.log(frequences, out = termes, where = tirages > 0), out = termes)
+        entropies = - termes.sum(axis = 1) / np.log(taille)
+
+        moyennes[i] = entropies.mean()
+        bas[i], hauts[i] = np.percentile(entropies, [2.5, 97.5])
+
+    return moyennes, bas, hauts
+
+
+def save_rarefied_entropy(familles, moyennes, bas, hauts, fichier):
+    """sauvegarde l'entropie des sous-échantillons dans un fichier texte,
+    au format "famille moyenne borne_inférieure borne_supérieure".
+
+    Parameters
+    ----------
+    familles: list
+        liste des numéros de famille
+
+    moyennes: numpy.ndarray
+        l'entropie moyenne de chaque famille
+
+    bas: numpy.ndarray
+        la borne inférieure de l'intervalle de confiance
+
+    hauts: numpy.ndarray
+        la borne supérieure de l'intervalle de confiance
+
+    fichier: string
+        le nom du fichier dans lequel les sauvegarder
+    """
+    with open(fichier, "w") as filout:
+        for num_fam, moyenne, borne_bas, borne_haut in zip(familles, moyennes.tolist(), bas.tolist(), hauts.tolist()):
+            if math.isnan(moyenne):
+                filout.write(f"la famille {num_fam} contient moins de séquences que la taille des sous-échantillons\n")
+            else:
+                filout.write(f"{num_fam} {moyenne} {borne_bas} {borne_haut}\n")
+
+
 def save_dict(entropy, fichier):
     """sauvegarde un dictionnaire dans un fichier texte.
 
@@ -174,36 +518,56 @@ def create_dict_taille_seq_uniques():
     taille_seq_uniques = {}
     
     with open("taille_des_familles.txt", "r") as filin:
-        lines = filin.readlines()
-        for line in lines:
-            taille_seq_uniques[int(line[0:3].strip(" \n "))] = 0
-            taille_seq_uniques[int(line[0:3].strip(" \n "))] += int(line[4:13].strip(" \n "))
+        for line in filin:
+            champs = line.split()
+            if champs:
+                taille_seq_uniques[int(champs[0])] = int(champs[1])
     
     return taille_seq_uniques
 
 def main():
     """Le main du programme."""   
 
+    fichiers, options = arguments()
+    entropy_file = "shannon_entropy.txt"
+
+    if options["store"] is not None:
+        options["batch"] = True
+        familles, sequences, nombres, debuts = store_count_table(options["store"])
+    elif options["batch"] or options["rarefy"] is not None:
+        familles, sequences, nombres, debuts = create_count_table(fichiers)
+
+    if options["rarefy"] is not None:
+        if familles:
+            moyennes, bas, hauts = rarefy_entropy(nombres, debuts, options["rarefy"], options["replicates"], options["random_seed"])
+        else:
+            moyennes = bas = hauts = np.zeros(0)
+        rarefy_file = "shannon_entropy_rarefy_{}.txt".format(options["rarefy"])
+        save_rarefied_entropy(familles, moyennes, bas, hauts, rarefy_file)
+
+    if options["batch"]:
+        entropy_dict = batch_entropy(familles, sequences, nombres, debuts)
+        save_dict(entropy_dict, entropy_file)
+        return
+
     taille_seq_uniques = create_dict_taille_seq_uniques()
     entropy_dict = {}
-    fichiers = arguments()
     
 
     for fichier in fichiers:
-        sequence, taille_famille = save_data(fichier)
-        compte = compte_seq(sequence)
+        compte, taille_famille = save_data(fichier)
         frequence = calc_freq(compte, taille_famille)
         entropy = calc_shannon_entropy(frequence, fichier, taille_seq_uniques)
-        entropy_dict[fichier.strip("family__all_seq.txt")] = 0
-        entropy_dict[fichier.strip("family__all_seq.txt")] += entropy
-        freq = "frequence_par_seq_famille_{}_all_seq.txt".format(fichier.strip("family__all_seq.txt"))
+        num_fam = family_number(fichier)
+        entropy_dict[num_fam] = 0
+        entropy_dict[num_fam] += entropy
+        freq = "frequence_par_seq_famille_{}_all_seq.txt".format(num_fam)
         frequence = dict(sorted(frequence.items(), key = lambda t: t[1], reverse = True))
         save_dict(frequence, freq)
-        compte_par_famille = "nbr_occ_seq_famille_{}.txt".format(fichier.strip("family__all_seq.txt"))
+        compte_par_famille = "nbr_occ_seq_famille_{}.txt".format(num_fam)
         compte = dict(sorted(compte.items(), key = lambda t: t[1], reverse = True))
         save_dict(compte, compte_par_famille)
     
-    entropy_file = "shannon_entropy.txt"
     save_dict(entropy_dict, entropy_file)
 
 
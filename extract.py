@@ -1,11 +1,16 @@
-"""Ce code permet d'extraire une famille d'un fichier texte contenant
-toutes les familles.
+"""Ce code permet d'extraire une ou plusieurs familles d'un fichier texte
+contenant toutes les familles.
+
+Chaque fichier n'est lu qu'une seule fois, quel que soit le nombre de
+familles demandées.
 
 Usage:
 ------
     python3 extract.py arguments
 
     arguments: fichier texte contenant des valeurs de toutes les familles
+    (profil_by_fam_in_round_Rxx_....txt), ou fichier binaire de profils
+    créé par family_in_files.py (profil_by_fam_in_round_....bin)
 
 """
 
@@ -13,7 +18,10 @@ Usage:
 ############ Modules à importer ############
 
 
+import os
+import re
 import sys
+from profile_store import load_profiles, profile_dict
 
 
 ############################################
@@ -31,14 +39,42 @@ def arguments():
         sys.exit("Veuillez renseigner au moins un fichier txt à lire")
     
     for index in range(1, len(sys.argv)):
-        if not sys.argv[index].endswith(".txt"):
-            sys.exit("Les fichiers renseignés doivent être au format txt")
+        if not sys.argv[index].endswith((".txt", ".bin")):
+            sys.exit("Les fichiers renseignés doivent être au format txt ou bin")
         fichiers.append(str(sys.argv[index]))
     
     return fichiers
 
 
-def save_data(fichier, answer):
+def read_families(answer):
+    """Lit la liste des familles à extraire.
+
+    Parameters
+    ----------
+    answer: string
+        réponse à l'input lors du lancement du programme : un ou plusieurs
+        numéros de famille séparés par des espaces ou des virgules, ou
+        "toutes" (ou rien) pour extraire toutes les familles
+
+    Returns
+    -------
+    familles: set
+        l'ensemble des numéros de famille voulus, ou None pour toutes les
+        familles
+    """
+    numeros = answer.replace(",", " ").split()
+
+    if not numeros or numeros == ["toutes"]:
+        return None
+
+    for numero in numeros:
+        if not numero.isdigit():
+            sys.exit(f"{numero} n'est pas un numéro de famille")
+
+    return set(numeros)
+
+
+def save_data(fichier, familles = None):
     """Lit un fichier.
 
     Parameters
@@ -46,32 +82,73 @@ def save_data(fichier, answer):
     fichier : string
         fichier texte à lire
     
-    answer: string
-        réponse à l'input lors du lancement du programme
+    familles: set
+        les numéros des familles voulues, ou None pour toutes les familles
 
     Returns
     -------
     data: dictionnary
-        dictionnaire contenant les valeurs de la famille voulue
+        dictionnaire contenant les valeurs de chaque famille voulue
     """ 
     data = {}
     
     with open(fichier, "r") as filin:
-        lines = filin.readlines()
-        lines = filter(str.strip, lines)
-        for line in lines:
-            if line[0] == answer and line[1] == " ":
-                line.strip(line[0:2])
-                if line[2:4] not in data.keys():
-                    data[line[2:4]] = {}
-                    data[line[2:4]][line[5]] = int(line[7:20].strip())
-                if line[2:4] in data.keys():
-                    data[line[2:4]][line[5]] = int(line[7:20].strip())
-            else:
-                continue
+        for line in filin:
+            champs = line.split()
+            if len(champs) == 4 and (familles is None or champs[0] in familles):
+                data.setdefault(champs[0], {}).setdefault(champs[1], {})[champs[2]] = int(champs[3])
 
     return data
 
+
+def save_data_bin(fichier, familles = None):
+    """Lit un fichier binaire de profils.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier binaire à lire
+    
+    familles: set
+        les numéros des familles voulues, ou None pour toutes les familles
+
+    Returns
+    -------
+    data: dictionnary
+        dictionnaire contenant pour chaque famille voulue le profil de
+        la famille à chaque round
+    """
+    data = {}
+    alphabet, entrees = load_profiles(fichier)
+
+    for famille, Round, decalage, comptes in entrees:
+        if familles is None or str(famille) in familles:
+            data.setdefault(str(famille), {})[Round] = profile_dict(comptes, alphabet, decalage)
+
+    return data
+
+
+def round_name(fichier):
+    """Donne le round contenu dans le nom d'un fichier.
+
+    Parameters
+    ----------
+    fichier : string
+        nom du fichier
+
+    Returns
+    -------
+    Round: string
+        le nom du round (R00, R01...)
+    """
+    resultat = re.search(r"_(R\d+)_", os.path.basename(fichier))
+
+    if resultat is None:
+        sys.exit(f"Le nom du fichier {fichier} ne contient pas de round")
+
+    return resultat.group(1)
+
+
 def save_dict_in_txt_file(fichier, dictionnaire):
     """sauvegarde un dictionnaire imbriqué dans un fichier texte.
 
@@ -105,18 +182,29 @@ def save_data_in_txt_file(fichier, liste):
 
 
 def main():
+    """Le main du programme."""
 
-    answer = input("Quelle famille voulez vous extraire ? ")
-    fichiers_saved = []
+    answer = input("Quelle.s famille.s voulez vous extraire ? (numéros séparés par des espaces, ou toutes) ")
+    familles = read_families(answer)
+    fichiers_saved = {}
     fichiers = arguments()
+
     for fichier in fichiers:
-        data = save_data(fichier, answer)
-        profil_file = f"profil_fam_{answer}_in_{fichier[23:26]}.txt"
-        fichiers_saved.append(profil_file)
-        save_dict_in_txt_file(profil_file, data)
+        if fichier.endswith(".bin"):
+            data_par_famille = save_data_bin(fichier, familles)
+        else:
+            Round = round_name(fichier)
+            data_par_famille = {famille: {Round: data} for famille, data in save_data(fichier, familles).items()}
+        for famille, data_par_round in data_par_famille.items():
+            for Round, data in data_par_round.items():
+                profil_file = f"profil_fam_{famille}_in_{Round}.txt"
+                fichiers_saved.setdefault(famille, []).append(profil_file)
+                save_dict_in_txt_file(profil_file, data)
+
+    for famille in sorted(fichiers_saved, key = int):
+        liste_file_saved = f"liste_fichiers_profil_fam_{famille}.txt"
+        save_data_in_txt_file(liste_file_saved, fichiers_saved[famille])
 
-    liste_file_saved = f"liste_fichiers_profil_fam_{answer}.txt"
-    save_data_in_txt_file(liste_file_saved, fichiers_saved)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+"""Ce module permet de sauvegarder régulièrement l'état de la création des
+familles (create_families de create_family.py) pour pouvoir la reprendre
+après un arrêt.
+
+Toutes les séquences des familles sont des séquences du dictionnaire de
+comptage : l'état est donc enregistré dans l'ordre de création des
+familles (séquences triées par nombre d'occurrences décroissant), déjà
+calculé. Le fichier .npz contient, pour chaque séquence de cet ordre, le
+numéro de sa famille (0 si elle n'est dans aucune famille), la position
+de la prochaine séquence de référence, ainsi qu'une empreinte des
+séquences et la distance maximum pour vérifier qu'il correspond aux
+mêmes données.
+
+Usage:
+------
+    from family_checkpoint import save_checkpoint, load_checkpoint
+
+    save_checkpoint("checkpoint_familles.npz", ordre, fam_seq, seq_fam, position, dist_max)
+    etat = load_checkpoint("checkpoint_familles.npz", ordre, compte_all, dist_max)
+"""
+
+
+############ Modules à importer ############
+
+
+import os
+import sys
+import hashlib
+import numpy as np
+
+
+############################################
+
+
+CHECKPOINT = "checkpoint_familles.npz"
+
+
+def order_digest(ordre):
+    """donne l'empreinte de l'ordre des séquences.
+
+    Parameters
+    ----------
+    ordre : list
+        les séquences triées par nombre d'occurrences décroissant
+
+    Returns
+    -------
+    empreinte: string
+        l'empreinte sha256 des séquences, dans l'ordre
+    """
+    empreinte = hashlib.sha256()
+
+    for seq in ordre:
+        empreinte.update(seq.encode("latin-1"))
+        empreinte.update(b"\n")
+
+    return empreinte.hexdigest()
+
+
+def save_checkpoint(fichier, ordre, fam_seq, seq_fam, position, dist_max, empreinte = None):
+    """sauvegarde l'état de la création des familles.
+
+    Le fichier est écrit sous un nom temporaire puis renommé : un arrêt
+    pendant l'écriture laisse le point de reprise précédent intact.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier .npz dans lequel sauvegarder l'état
+
+    ordre: list
+        les séquences triées par nombre d'occurrences décroissant
+
+    fam_seq: dictionnary
+        dictionnaire contenant la liste des séquences de chaque famille
+
+    seq_fam: dictionnary
+        dictionnaire contenant le numéro de famille de chaque séquence
+        déjà dans une famille
+
+    position: int
+        la position dans ordre à partir de laquelle chercher la prochaine
+        séquence de référence
+
+    dist_max: int
+        la distance de Levenshtein maximum
+
+    empreinte: string
+        l'empreinte de ordre, calculée si elle n'est pas renseignée
+    """
+    if empreinte is None:
+        empreinte = order_digest(ordre)
+
+    type_famille = np.int32 if max(fam_seq, default = 0) < 2 ** 31 else np.int64
+    numeros = np.fromiter((seq_fam.get(seq, 0) for seq in ordre), dtype = type_famille, count = len(ordre))
+
+    with open(fichier + ".tmp", "wb") as filout:
+        np.savez(filout, familles = np.fromiter(fam_seq, dtype = np.int64, count = len(fam_seq)),
+                 numeros = numeros, position = np.int64(position), dist_max = np.int64(dist_max),
+                 nb_sequences = np.int64(len(ordre)), empreinte = np.array(empreinte))
+    os.replace(fichier + ".tmp", fichier)
+
+
+def load_checkpoint(fichier, ordre, sequences, dist_max, empreinte = None):
+    """relit l'état de la création des familles.
+
+    La séquence de référence de chaque famille est sa première séquence
+    dans ordre ; les autres séquences sont rangées dans l'ordre de
+    sequences, celui dans lequel create_families les a trouvées.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier .npz écrit par save_checkpoint
+
+    ordre: list
+        les séquences triées par nombre d'occurrences décroissant
+
+    sequences: dictionnary
+        le dictionnaire de comptage donné à create_families
+
+    dist_max: int
+        la distance de Levenshtein maximum
+
+    empreinte: string
+        l'empreinte de ordre, calculée si elle n'est pas renseignée
+
+    Returns
+    -------
+    fam_seq: dictionnary
+        dictionnaire contenant la liste des séquences de chaque famille,
+        ou None si le fichier n'existe pas
+
+    seq_fam: dictionnary
+        dictionnaire contenant le numéro de famille de chaque séquence
+        déjà dans une famille
+
+    position: int
+        la position de la prochaine séquence de référence dans ordre
+    """
+    if not os.path.exists(fichier):
+        return None, None, 0
+
+    if empreinte is None:
+        empreinte = order_digest(ordre)
+
+    with np.load(fichier) as etat:
+        if "numeros" not in etat:
+            sys.exit(f"Le point de reprise {fichier} a été écrit par une version précédente : relancez sans --resume")
+        if int(etat["nb_sequences"]) != len(ordre) or str(etat["empreinte"]) != empreinte:
+            sys.exit(f"Le point de reprise {fichier} a été créé à partir d'autres séquences")
+        if int(etat["dist_max"]) != dist_max:
+            sys.exit(f"Le point de reprise {fichier} a été créé avec une distance maximum de {int(etat['dist_max'])}")
+        familles = etat["familles"].tolist()
+        numeros = etat["numeros"]
+        position = int(etat["position"])
+
+    fam_seq = {num_famille: [] for num_famille in familles}
+    seq_fam = {}
+
+    rangs = np.flatnonzero(numeros)
+
+    for rang, num_famille in zip(rangs.tolist(), numeros[rangs].tolist()):
+        seq = ordre[rang]
+        seq_fam[seq] = num_famille
+        if not fam_seq[num_famille]:
+            fam_seq[num_famille].append(seq)
+
+    for seq in sequences:
+        num_famille = seq_fam.get(seq)
+        if num_famille is not None and fam_seq[num_famille][0] != seq:
+            fam_seq[num_famille].append(seq)
+
+    return fam_seq, seq_fam, position
@@ -4,11 +4,23 @@ les fichiers fasta contenant les séquences.
 
 Usage:
 ------
-    python3 family_in_files.py arguments arguments2
+    python3 family_in_files.py [options] arguments arguments2
 
     arguments: fichier texte contenant des séquences nucléiques
+    (family_N_diff_seq.txt, family_N_all_seq.txt ou family_N_count_seq.txt)
 
     arguments2: fichier fasta contenant des séquences nucléiques
+
+    options:
+        --workers N: traite les fichiers fasta (rounds) sur N processus
+
+        --dist-max N: attribue aussi chaque séquence d'un round absente des
+        familles à la famille dont la séquence de référence (première
+        séquence du fichier de la famille) est la plus proche, si la
+        distance de Levenshtein est inférieure ou égale à N
+
+        --store DOSSIER: lit les comptages de chaque round dans le dossier
+        écrit par count_store.py au lieu de relire les fichiers fasta
 """
 
 
@@ -16,32 +28,64 @@ Usage:
 
 
 import sys
+import multiprocessing
 from tqdm import tqdm
 import operator
+import numpy as np
+from fasta_reader import read_fasta, read_lines, read_counts, is_count_file, family_number, round_name
+from count_store import CountStore
+from bktree import BKTree
+from profile_matrix import profile_matrix, profile_dict
+from profile_store import save_profiles
 
 
 ############################################
 
 
+TAILLE_ABSENTES = 1 << 20
+
+
 def arguments(answer):
     """Vérifier le format et le nombre d'arguments renseigné.
 
     Returns
     -------
     fichiers: liste de tous les fichiers donnés en argument.
+
+    options: dictionnaire contenant les options renseignées en argument.
     """
 
     fichiers = []
+    options = {"workers": 1, "dist_max": None, "store": None}
     if answer != "oui":
         sys.exit("veuillez renseigner des fichiers texte et fasta à lire")
     
     if len(sys.argv) < 3:
         sys.exit("Veuillez renseigner au moins un fichier texte et un fichier fasta à lire")
     
-    for i in range(1, len(sys.argv)):
-        fichiers.append(str(sys.argv[i]))
+    index = 1
+
+    while index < len(sys.argv):
+        if sys.argv[index] == "--workers":
+            index += 1
+            if index == len(sys.argv) or not sys.argv[index].isdigit() or int(sys.argv[index]) < 1:
+                sys.exit("L'option --workers doit être suivie d'un nombre de processus")
+            options["workers"] = int(sys.argv[index])
+        elif sys.argv[index] == "--dist-max":
+            index += 1
+            if index == len(sys.argv) or not sys.argv[index].isdigit():
+                sys.exit("L'option --dist-max doit être suivie d'une distance de Levenshtein")
+            options["dist_max"] = int(sys.argv[index])
+        elif sys.argv[index] == "--store":
+            index += 1
+            if index == len(sys.argv):
+                sys.exit("L'option --store doit être suivie d'un nom de dossier")
+            options["store"] = sys.argv[index]
+        else:
+            fichiers.append(str(sys.argv[index]))
+        index += 1
     
-    return fichiers
+    return fichiers, options
 
 
 def save_data(fichiers):
@@ -85,41 +129,14 @@ def read_txt_files(fichier_txt):
     -------
     data: list
         liste contenant les séquences présentes dans le fichier texte.
+        Pour un fichier family_N_count_seq.txt, chaque séquence unique
+        n'apparait qu'une fois.
     """
 
-    data = []
-    
-    with open(fichier_txt, "r") as filin:
-        lines = filin.readlines()
-        for line in lines:
-            data.append(line.strip())
-
-    return data
-
-
-def read_fasta_files(fichier_fasta):
-    """Lit un fichier fasta.
-
-    Parameters
-    ----------
-    fichiers_txt : list
-        liste des fichiers à lire
-
-    Returns
-    -------
-    data: list
-        liste contenant les séquences présentes dans le fichier fasta.
-    """
-
-    data = []
-
-    with open(fichier_fasta, "r") as filin:
-        lines = filin.readlines()
-        for line in lines:
-            if line.startswith(">"):
-                continue
-            else:
-                data.append(line.strip())
+    if is_count_file(fichier_txt):
+        data = [seq for seq, nombre in read_counts(fichier_txt)]
+    else:
+        data = list(read_lines(fichier_txt))
 
     return data
 
@@ -130,22 +147,16 @@ def extract_common_seq_len(common_seq, taille_round):
     
     Parameters
     ----------
-    common_seq: list
-        liste des séquences communes entre une famille et le round donné
+    common_seq: dictionnary
+        dictionnaire contenant les séquences communes entre une famille et
+        le round donné et leur nombre d'occurrences à ce round
 
     taille_round: int
         le nombre de séquences présent à ce round
     """
 
-    common_seq_len = 0
-    freq_common_seq_len = 0
-
-
-    for seq in common_seq:
-        common_seq_len += 1
-
-    
-    freq_common_seq_len = len(common_seq) / taille_round
+    common_seq_len = sum(common_seq.values())
+    freq_common_seq_len = common_seq_len / taille_round
 
     
     return common_seq_len, freq_common_seq_len
@@ -182,84 +193,46 @@ def create_profils(compte, dic_b, common_seq):
         dictionnaire contenant les séquences d'un round donné et leur
         nombre d'occurrences.
 
-    common_seq: list
-        list contenant toutes les séquences communes à une famille donnée
-        à un round donné
+    common_seq: dictionnary
+        dictionnaire contenant les séquences communes à une famille donnée
+        à un round donné et leur nombre d'occurrences
 
     Returns
     -------
     profils: dictionnary
         dictionnaire contenant le profil de la famille donné à un round donné
     """
-    profils = {}
-
     seq_len_max = extract_max_from_dict(compte)
-
-    wanted_seq = [common_seq[i] for i in range(len(common_seq)) if len(common_seq[i]) == seq_len_max]
-
-    for seq in wanted_seq:
-        for j, base in enumerate(seq):
-            
-            if (j + 24) not in profils.keys():
-                profils[j + 24] = {}
-            
-            if base not in profils[j + 24].keys():
-                profils[j + 24][base] = 1
-            
-            else:
-                profils[j + 24][base] += 1
+    comptes, alphabet = profile_matrix(common_seq, seq_len_max)
+    profils = profile_dict(comptes, alphabet)
     
     return profils
 
 
-def create_count_dict(a, b):
-    """créer un dictionnaire.
+def count_seq_len(common_seq):
+    """compte le nombre de séquences de chaque longueur.
 
     Parameters
     ----------
-    a : list
-        liste de séquences
-
-    b: list
-        liste de séquences
+    common_seq : dictionnary
+        dictionnaire contenant des séquences et leur nombre d'occurrences
 
     Returns
     -------
-    dic_b: dictionnary
-        dictionnaire contenant les séquences de la liste b et leur
-        nombre d'occurrences.
-
-    common_seq: list
-        list contenant toutes les séquences communes aux deux listes a et b
-
     compte: dictionnary
         dictionnaire contenant le le nombre de fois qu'apparait une séquence
         d'une taille donnée
-    """  
-    
-    dic_b = {}.fromkeys(set(b), 0)
+    """
     compte = {}
-    common_seq = list(set(a) & set(b))
-
-    for seq in b:
-        dic_b[seq] += 1
 
-    for seq, nbr in tqdm(dic_b.items()):
-        if seq in common_seq:
-            tmp = seq.split()
-            multiplicateur = nbr - 1
-            if multiplicateur != 0:
-                common_seq += tmp * multiplicateur
-
-    for seq in common_seq:
+    for seq, nombre in common_seq.items():
         cle = len(seq)
         if cle in compte.keys():
-            compte[cle] += 1
+            compte[cle] += nombre
         else:
-            compte[cle] = 0
-            compte[cle] += 1
+            compte[cle] = nombre
 
-    return compte, common_seq
+    return compte
 
 
 def find_common_seq(a, b):
@@ -279,41 +252,373 @@ def find_common_seq(a, b):
         dictionnaire contenant les séquences de la liste b et leur
         nombre d'occurrences.
 
-    common_seq: list
-        list contenant toutes les séquences communes aux deux listes a et b
+    common_seq: dictionnary
+        dictionnaire contenant les séquences communes aux deux listes a et b
+        et leur nombre d'occurrences dans la liste b
 
     taille_round: int
         le nombre de séquences présentes à ce round
     """    
 
-    dic_b = {}.fromkeys(set(b), 0)
-    common_seq = list(set(a) & set(b))
+    dic_b = {}
+    famille = set(a)
 
     taille_round = len(b)
     for seq in b:
-        dic_b[seq] += 1
+        dic_b[seq] = dic_b.get(seq, 0) + 1
 
-    for seq, nbr in tqdm(dic_b.items()):
-        if seq in common_seq:
-            tmp = seq.split()
-            multiplicateur = nbr - 1
-            if multiplicateur != 0:
-                common_seq += tmp * multiplicateur
+    common_seq = {seq: nbr for seq, nbr in tqdm(dic_b.items()) if seq in famille}
 
     return dic_b, common_seq, taille_round
 
 
-def count_file_seq_in_family(family_dict, round_dict):
+def build_family_index(family_dict):
+    """créer l'index inversé des familles.
+
+    Les clés de l'index sont les séquences elles-mêmes : chaque lecture
+    d'un round y est recherchée telle qu'elle est lue, sans être codée.
+
+    Parameters
+    ----------
+    family_dict : dictionnary
+        dictionnaire contenant les séquences de chaque famille
+
+    Returns
+    -------
+    index: dictionnary
+        dictionnaire contenant pour chaque séquence la liste des familles
+        auxquelles elle appartient
+    """
+    index = {}
+
+    for num_fam, seq_list in family_dict.items():
+        for seq in seq_list:
+            familles = index.setdefault(seq, [])
+            if num_fam not in familles:
+                familles.append(num_fam)
+
+    return index
+
+
+def assign_to_family(seq, index, arbre, dist_max):
+    """attribue une séquence absente des familles à la famille dont la
+    séquence de référence est la plus proche.
+
+    Une séquence attribuée est ajoutée à l'index inversé, qui sert ainsi
+    de cache : elle n'est recherchée qu'une seule fois. Les séquences sans
+    famille ne sont pas ajoutées, pour que l'index ne grossisse pas avec
+    les séquences uniques des rounds.
+
+    Parameters
+    ----------
+    seq : string
+        la séquence à attribuer
+
+    index: dictionnary
+        index inversé des familles, complété par la séquence
+
+    arbre: BKTree
+        BK-tree contenant la séquence de référence de chaque famille
+
+    dist_max: int
+        la distance de Levenshtein maximum à la séquence de référence
+
+    Returns
+    -------
+    familles: list
+        la famille attribuée à la séquence, ou None si aucune séquence de
+        référence n'est assez proche
+    """
+    graine = arbre.plus_proche(seq, dist_max)
+
+    if graine is None:
+        return None
+
+    index[seq] = index[graine][:1]
+
+    return index[seq]
+
+
+def read_round(fichier_fasta, compte = None, store = None, membres = None, toutes = False):
+    """donne les séquences d'un round et leur nombre d'occurrences.
+
+    Parameters
+    ----------
+    fichier_fasta : string
+        fichier fasta du round
+
+    compte: dictionnary
+        si renseigné, le dictionnaire de comptage du round, déjà calculé :
+        le fichier fasta n'est pas lu
+
+    store: CountStore
+        si renseigné, les comptages du round sont lus dans ce dossier
+        (projeté en mémoire) au lieu du fichier fasta
+
+    membres: numpy.ndarray
+        les identifiants triés, dans le catalogue du store, des séquences
+        des familles : seules ces séquences sont décodées
+
+    toutes: bool
+        si True, toutes les séquences du round sont décodées
+
+    Returns
+    -------
+    lectures: iterable
+        les couples (séquence, nombre d'occurrences) du round ; chaque
+        lecture du fichier fasta donne un couple (séquence, 1)
+
+    taille_round: int
+        le nombre de séquences présentes à ce round, ou None s'il est
+        donné par la somme des lectures
+    """
+    if compte is not None:
+        return compte.items(), None
+
+    if store is None:
+        return ((seq, 1) for seq in read_fasta(fichier_fasta)), None
+
+    identifiants, nombres = store.round_counts(fichier_fasta)
+    taille_round = int(nombres.sum(dtype = np.int64))
+
+    if not toutes:
+        garde = np.isin(identifiants, membres)
+        identifiants, nombres = identifiants[garde], nombres[garde]
+
+    lectures = ((store.catalogue.sequence(identifiant), nombre)
+                for identifiant, nombre in zip(identifiants.tolist(), nombres.tolist()))
+
+    return lectures, taille_round
+
+
+def count_round_in_families(lectures, index, arbre = None, dist_max = 0):
+    """Parcourt une seule fois les séquences d'un round et compte celles
+    appartenant à au moins une famille.
+
+    Les séquences sans famille à moins de dist_max d'une séquence de
+    référence sont gardées dans un ensemble propre au round, vidé dès
+    qu'il contient TAILLE_ABSENTES séquences.
+
+    Parameters
+    ----------
+    lectures : iterable
+        les couples (séquence, nombre d'occurrences) du round, renvoyés
+        par read_round
+
+    index: dictionnary
+        index inversé des familles, renvoyé par build_family_index
+
+    arbre: BKTree
+        si renseigné, BK-tree contenant la séquence de référence de chaque
+        famille : les séquences absentes des familles sont attribuées à la
+        famille de la séquence de référence la plus proche
+
+    dist_max: int
+        la distance de Levenshtein maximum à la séquence de référence
+
+    Returns
+    -------
+    dic_fam: dictionnary
+        dictionnaire contenant pour chaque famille les séquences présentes
+        à ce round et leur nombre d'occurrences
+
+    taille_round: int
+        le nombre de séquences lues
+    """
+    dic_b = {}
+    taille_round = 0
+    absentes = set()
+
+    for seq, nombre in tqdm(lectures):
+        taille_round += nombre
+        familles = index.get(seq)
+        if familles is None and arbre is not None and seq not in absentes:
+            familles = assign_to_family(seq, index, arbre, dist_max)
+            if familles is None:
+                if len(absentes) == TAILLE_ABSENTES:
+                    absentes.clear()
+                absentes.add(seq)
+        if familles:
+            dic_b[seq] = dic_b.get(seq, 0) + nombre
+
+    dic_fam = {}
+
+    for seq, nbr in dic_b.items():
+        for num_fam in index[seq]:
+            dic_fam.setdefault(num_fam, {})[seq] = nbr
+
+    return dic_fam, taille_round
+
+
+def count_round_seq_in_family(fichier_fasta, familles, index, arbre = None, dist_max = 0, store = None, membres = None,
+                              compte_round = None):
+    """compte le nombre de séquences de chaque famille présentes à un round.
+
+    Parameters
+    ----------
+    fichier_fasta : string
+        fichier fasta du round
+
+    familles: list
+        liste des numéros de famille, dans l'ordre de sortie
+
+    index: dictionnary
+        index inversé des familles, renvoyé par build_family_index
+
+    arbre: BKTree
+        si renseigné, BK-tree contenant la séquence de référence de chaque
+        famille
+
+    dist_max: int
+        la distance de Levenshtein maximum à la séquence de référence
+
+    store: CountStore
+        si renseigné, les comptages du round sont lus dans ce dossier
+
+    membres: numpy.ndarray
+        les identifiants triés, dans le catalogue du store, des séquences
+        des familles
+
+    compte_round: dictionnary
+        si renseigné, le dictionnaire de comptage du round, utilisé à la
+        place du fichier fasta
+
+    returns
+    -------
+    nbr_seq_in_families : dictionnary
+        dictionnaire contenant le nombre de séquences présentes par famille
+
+    freq_seq_in_families: dictionnary
+        dictionnaire contenant la fréquence de chaque famille
+
+    profils: dictionnary
+        dictionnaire contenant le profil de chaque famille
+
+    compte: dictionnary
+        dictionnaire contenant le nombre de séquences de chaque longueur
+        de chaque famille
+    """
+
+    nbr_seq_in_families = {}
+    freq_seq_in_families = {}
+    profils = {}
+    compte = {}
+
+    lectures, taille_round = read_round(fichier_fasta, compte_round, store, membres, arbre is not None)
+    dic_fam, taille_lue = count_round_in_families(lectures, index, arbre, dist_max)
+
+    if taille_round is None:
+        taille_round = taille_lue
+
+    for num_fam in familles:
+        common_seq = dic_fam.get(num_fam, {})
+        compte[num_fam] = count_seq_len(common_seq)
+        nbr_seq_in_families[num_fam], freq_seq_in_families[num_fam] = extract_common_seq_len(common_seq, taille_round)
+        if common_seq:
+            profils[num_fam] = create_profils(compte[num_fam], common_seq, common_seq)
+        if not common_seq:
+            profils[num_fam] = "Famille absente de ce Round"
+
+    return nbr_seq_in_families, freq_seq_in_families, profils, compte
+
+
+ETAT_PROCESSUS = {}
+
+
+def init_worker(familles, index, arbre, dist_max, store, membres):
+    """Transmet une seule fois les familles, l'index inversé et le
+    BK-tree des séquences de référence à un processus.
+
+    Parameters
+    ----------
+    familles: list
+        liste des numéros de famille
+
+    index: dictionnary
+        index inversé des familles
+
+    arbre: BKTree
+        le BK-tree des séquences de référence, ou None
+
+    dist_max: int
+        la distance de Levenshtein maximum à la séquence de référence
+
+    store: string
+        le dossier écrit par count_store.py, ouvert dans le processus, ou
+        None
+
+    membres: numpy.ndarray
+        les identifiants des séquences des familles dans ce dossier
+    """
+    ETAT_PROCESSUS["familles"] = familles
+    ETAT_PROCESSUS["index"] = index
+    ETAT_PROCESSUS["arbre"] = arbre
+    ETAT_PROCESSUS["dist_max"] = dist_max
+    ETAT_PROCESSUS["store"] = None if store is None else CountStore(store)
+    ETAT_PROCESSUS["membres"] = membres
+
+
+def count_round_worker(fichier_fasta, compte_round = None):
+    """Traite un round dans un processus initialisé par init_worker.
+
+    Parameters
+    ----------
+    fichier_fasta : string
+        fichier fasta du round
+
+    compte_round: dictionnary
+        le dictionnaire de comptage du round, ou None pour lire le
+        fichier fasta
+
+    returns
+    -------
+    resultats: tuple
+        les dictionnaires renvoyés par count_round_seq_in_family
+    """
+    return count_round_seq_in_family(fichier_fasta, ETAT_PROCESSUS["familles"],
+                                     ETAT_PROCESSUS["index"], ETAT_PROCESSUS["arbre"],
+                                     ETAT_PROCESSUS["dist_max"], ETAT_PROCESSUS["store"],
+                                     ETAT_PROCESSUS["membres"], compte_round)
+
+
+def count_file_seq_in_family(family_dict, fichiers_fasta, workers = 1, dist_max = None, store = None, comptes = None):
     """compte le nombre de séquences présentes à chaque round pour
     chaque famille.
 
+    Chaque fichier fasta n'est lu qu'une fois : ses séquences sont
+    réparties entre toutes les familles grâce à un index inversé
+    séquence -> familles. Avec plusieurs processus, chaque round est
+    traité par un processus ; seul le nom du fichier fasta lui est envoyé,
+    avec son dictionnaire de comptage s'il est déjà calculé.
+    Avec un dossier de comptages, les comptages de chaque round y sont
+    lus à la place du fichier fasta ; les rounds déjà comptés en mémoire
+    (comptes) ne sont pas relus.
+
     Parameters
     ----------
     family_dict : dictionnary
-        dictionnaire contenant la famille à tester
+        dictionnaire contenant les familles à tester
 
-    round_dict: dictionnary
-        dictionnaire contenant les séquences présentes à chaque round
+    fichiers_fasta: list
+        liste des fichiers fasta de chaque round
+
+    workers: int
+        le nombre de processus
+
+    dist_max: int
+        si renseigné, les séquences absentes des familles sont attribuées
+        à la famille dont la séquence de référence (première séquence de
+        la famille) est la plus proche, à une distance inférieure ou égale
+        à dist_max
+
+    store: string
+        si renseigné, le dossier écrit par count_store.py contenant les
+        comptages des rounds
+
+    comptes: dictionnary
+        si renseigné, dictionnaire contenant pour chaque fichier fasta son
+        dictionnaire de comptage ; il est envoyé au processus qui traite le
+        round
 
     returns
     -------
@@ -338,22 +643,40 @@ def count_file_seq_in_family(family_dict, round_dict):
     profils = {}
     compte = {}
 
-    for cle in round_dict.keys():
-        nbr_seq_in_families[cle] = {}
-        freq_seq_in_families[cle] = {}
-        profils[cle] = {}
-        compte[cle] = {}
-
-    for num_fam, seq_list in family_dict.items():
-        for Round, seq_list2 in round_dict.items():
-            
-            compte[Round][num_fam], common_seq = create_count_dict(seq_list, seq_list2)
-            dic_b, common_seq, taille_round = find_common_seq(seq_list, seq_list2)
-            nbr_seq_in_families[Round][num_fam], freq_seq_in_families[Round][num_fam] = extract_common_seq_len(common_seq, taille_round)
-            if common_seq:
-                profils[Round][num_fam] = create_profils(compte[Round][num_fam], dic_b, common_seq)
-            if not common_seq:
-                profils[Round][num_fam] = "Famille absente de ce Round"
+    familles = list(family_dict.keys())
+    index = build_family_index(family_dict)
+    arbre = None
+
+    if dist_max is not None:
+        graines = [seq_list[0] for seq_list in family_dict.values() if seq_list]
+        arbre = BKTree(graines)
+
+    comptages = None
+    membres = None
+
+    if store is not None:
+        comptages = CountStore(store)
+        if arbre is None:
+            identifiants = (comptages.catalogue.get_id(seq) for seq in index)
+            membres = np.unique(np.fromiter((identifiant for identifiant in identifiants if identifiant is not None), dtype = np.int64))
+
+    if comptes is None:
+        comptes = {}
+
+    if workers == 1 or len(fichiers_fasta) == 1:
+        resultats = [count_round_seq_in_family(fichier, familles, index, arbre, dist_max, comptages, membres, comptes.get(fichier))
+                     for fichier in fichiers_fasta]
+    else:
+        with multiprocessing.Pool(min(workers, len(fichiers_fasta)), init_worker,
+                                  (familles, index, arbre, dist_max, store, membres)) as pool:
+            resultats = pool.starmap(count_round_worker, [(fichier, comptes.get(fichier)) for fichier in fichiers_fasta])
+
+    for fichier, (nbr_seq, freq_seq, profil, compte_round) in zip(fichiers_fasta, resultats):
+        Round = round_name(fichier)
+        nbr_seq_in_families[Round] = nbr_seq
+        freq_seq_in_families[Round] = freq_seq
+        profils[Round] = profil
+        compte[Round] = compte_round
     
     return nbr_seq_in_families, freq_seq_in_families, profils, compte
 
@@ -383,7 +706,7 @@ def diversification_mesure(family_dict, round_dict):
 
     for num_fam, seq_list in tqdm(family_dict.items()):
         for Round, seq_list2 in round_dict.items():
-            common_seq[Round] = []
+            common_seq[Round] = {}
             dic_b, common_seq[Round], taille_round = find_common_seq(seq_list, seq_list2)
 
 
@@ -396,11 +719,11 @@ def diversification_mesure(family_dict, round_dict):
     sequences = set()
     
     for r in rounds:
-        for seq in common_seq[r]:
+        for seq, nbr in common_seq[r].items():
             if seq not in sequences:
                 if seq not in div_dict[r].keys():
                     div_dict[r][seq] = 0
-                div_dict[r][seq] += 1
+                div_dict[r][seq] += nbr
         for cle, seq in div_dict[r].items():
             sequences.add(seq)
 
@@ -495,82 +818,56 @@ def main():
     answer = input("Avez vous renseigné des fichiers texte PUIS des fichiers fasta ? (oui/non) ")
     answer2 = input("Quelle famille voulez vous traiter ? ")
 
-    fichiers = arguments(answer)
+    fichiers, options = arguments(answer)
     fichiers_txt, fichiers_fasta = save_data(fichiers)
 
     keys = []
     
     for fichier in tqdm(fichiers_txt):
-        if fichier.endswith("_diff_seq.txt"):
-            keys.append(int(fichier.strip("family__diff_seq.txt")))
-        if fichier.endswith("_all_seq.txt"):
-            keys.append(int(fichier.strip("family__all_seq.txt")))
+        keys.append(family_number(fichier))
     
     family_dict = {}.fromkeys(set(keys), [])
     
     for fichier in tqdm(fichiers_txt):
-        if fichier.endswith("_diff_seq.txt"):
-            data = read_txt_files(fichier)
-            family_dict[int(fichier.strip("family__diff_seq.txt"))] = list(data)
-        if fichier.endswith("_all_seq.txt"):
-            data = read_txt_files(fichier)
-            family_dict[int(fichier.strip("family__all_seq.txt"))] = list(data)
-    
-    keys = []
-    
-    for fichier in tqdm(fichiers_fasta):
-        keys.append(fichier[0:3])
-    
-    round_dict = {}.fromkeys(set(keys), [])
+        data = read_txt_files(fichier)
+        family_dict[family_number(fichier)] = list(data)
     
-    for fichier in tqdm(fichiers_fasta):
-        data = read_fasta_files(fichier)
-        round_dict[fichier[0:3]] = list(data)
-
 
 #    diversification_dict = diversification_mesure(family_dict, round_dict)
 #    div_file = f"diversification_famille_{answer2}.txt"
 #    div_file2 = f"diversification_famille_{answer2}_count.txt"
 #    save_data_in_txt_file(div_file, div_file2,  diversification_dict)
 
-    nbr_seq_in_families, freq_seq_in_families, profils, compte = count_file_seq_in_family(family_dict, round_dict)
+    nbr_seq_in_families, freq_seq_in_families, profils, compte = count_file_seq_in_family(family_dict, fichiers_fasta, options["workers"], options["dist_max"], options["store"])
     
     nbr_seq_in_families = dict(sorted(nbr_seq_in_families.items(), key = lambda t: t[0][0]))
     freq_seq_in_families = dict(sorted(freq_seq_in_families.items(), key = lambda t: t[0][0]))
     compte = dict(sorted(compte.items(), key = lambda t: t[0][0][0]))
     profils = dict(sorted(profils.items(), key = lambda t: t[0][0], reverse = True))
 
+    for suffixe in ("diff_seq", "all_seq", "count_seq"):
+        if fichiers_txt[0].endswith(f"_{suffixe}.txt"):
+            break
+
     for cle in compte.keys():
-        if fichiers_txt[0].endswith("_diff_seq.txt"):
-            fichier_compte = f"seq_count_by_fam_in_round_{cle}_diff_seq.txt"
-            save_data_in_text_file(fichier_compte, compte[cle])
-        if fichiers_txt[0].endswith("_all_seq.txt"):
-            fichier_compte = f"seq_count_by_fam_in_round_{cle}_all_seq.txt"
-            save_data_in_text_file(fichier_compte, compte[cle])
+        fichier_compte = f"seq_count_by_fam_in_round_{cle}_{suffixe}.txt"
+        save_data_in_text_file(fichier_compte, compte[cle])
 
     for cle in profils.keys():
-        if fichiers_txt[0].endswith("_diff_seq.txt"):
-            profil_seq = f"profil_by_fam_in_round_{cle}_diff_seq.txt"
-            save_data_of_nested_dic(profil_seq, profils[cle])
-        if fichiers_txt[0].endswith("_all_seq.txt"):
-            profil_seq = f"profil_by_fam_in_round_{cle}_all_seq.txt"
-            save_data_of_nested_dic(profil_seq, profils[cle])
+        profil_seq = f"profil_by_fam_in_round_{cle}_{suffixe}.txt"
+        save_data_of_nested_dic(profil_seq, profils[cle])
+
+    profils_binaires = {(num_fam, cle): profil for cle in profils.keys()
+                        for num_fam, profil in profils[cle].items() if isinstance(profil, dict)}
+    save_profiles(f"profil_by_fam_in_round_{suffixe}.bin", profils_binaires)
 
     for cle in nbr_seq_in_families.keys():
-        if fichiers_txt[0].endswith("_diff_seq.txt"):
-            nbr_seq = f"seq_by_family_in_round_{cle}_diff_seq.txt"
-            save_data_in_text_file(nbr_seq, nbr_seq_in_families[cle])
-        if fichiers_txt[0].endswith("_all_seq.txt"):
-            nbr_seq = f"seq_by_family_in_round_{cle}_all_seq.txt"
-            save_data_in_text_file(nbr_seq, nbr_seq_in_families[cle])
+        nbr_seq = f"seq_by_family_in_round_{cle}_{suffixe}.txt"
+        save_data_in_text_file(nbr_seq, nbr_seq_in_families[cle])
 
     for cle in freq_seq_in_families.keys():
-        if fichiers_txt[0].endswith("_diff_seq.txt"):
-            freq_seq = f"freq_by_family_in_round_{cle}_diff_seq.txt"
-            save_data_in_text_file(freq_seq, freq_seq_in_families[cle])
-        if fichiers_txt[0].endswith("_all_seq.txt"):
-            freq_seq = f"freq_by_family_in_round_{cle}_all_seq.txt"
-            save_data_in_text_file(freq_seq, freq_seq_in_families[cle])
+        freq_seq = f"freq_by_family_in_round_{cle}_{suffixe}.txt"
+        save_data_in_text_file(freq_seq, freq_seq_in_families[cle])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""Ce module permet de lire les fichiers de séquences au fil de l'eau,
+sans charger tout le fichier en mémoire.
+
+Les fichiers sont lus en binaire avec un tampon de grande taille. Les
+séquences sont renvoyées une à une, ce qui permet de les compter
+directement sans construire de liste intermédiaire.
+
+Usage:
+------
+    from fasta_reader import read_fasta, count_sequences
+
+    compte = count_sequences(read_fasta("R00.fastq_result.fas"))
+"""
+
+
+############ Modules à importer ############
+
+
+import os
+import re
+import sys
+from collections import Counter
+
+
+############################################
+
+
+TAILLE_TAMPON = 1 << 20
+
+
+def read_fasta(fichier, headers = False):
+    """Lit un fichier fasta séquence par séquence.
+
+    Les enregistrements dont la séquence est répartie sur plusieurs
+    lignes sont réassemblés.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier fasta à lire
+
+    headers: bool
+        si True, renvoie des tuples (nom, séquence) au lieu des séquences
+
+    Yields
+    ------
+    sequence: string
+        séquence de l'enregistrement, ou tuple (nom, séquence) si
+        headers est True.
+    """
+    nom = None
+    morceaux = []
+
+    with open(fichier, "rb", buffering = TAILLE_TAMPON) as filin:
+        for line in filin:
+            if line.startswith(b">"):
+                if nom is not None:
+                    sequence = b"".join(morceaux).decode("latin-1")
+                    yield (nom, sequence) if headers else sequence
+                nom = line.strip().decode("latin-1")
+                morceaux = []
+            else:
+                line = line.strip()
+                if line:
+                    morceaux.append(line)
+
+    if nom is not None:
+        sequence = b"".join(morceaux).decode("latin-1")
+        yield (nom, sequence) if headers else sequence
+
+
+def read_lines(fichier):
+    """Lit un fichier texte contenant une séquence par ligne.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier texte à lire
+
+    Yields
+    ------
+    sequence: string
+        la séquence de chaque ligne
+    """
+    with open(fichier, "rb", buffering = TAILLE_TAMPON) as filin:
+        for line in filin:
+            yield line.strip().decode("latin-1")
+
+
+def count_sequences(sequences, compte = None):
+    """compte le nombre d'occurrences de chaque séquence.
+
+    Parameters
+    ----------
+    sequences: iterable
+        les séquences à compter, par exemple renvoyées par read_fasta
+
+    compte: dictionnary
+        dictionnaire de comptage à compléter, un nouveau dictionnaire
+        est créé s'il n'est pas renseigné
+
+    Returns
+    -------
+    compte: dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+    """
+    if compte is None:
+        compte = Counter()
+
+    if isinstance(compte, Counter):
+        compte.update(sequences)
+    else:
+        for seq in sequences:
+            compte[seq] = compte.get(seq, 0) + 1
+
+    return compte
+
+
+def read_counts(fichier):
+    """Lit un fichier de famille au format compact, contenant sur chaque
+    ligne une séquence unique et son nombre d'occurrences.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier texte à lire
+
+    Yields
+    ------
+    sequence: tuple
+        tuple (séquence, nombre d'occurrences)
+    """
+    with open(fichier, "rb", buffering = TAILLE_TAMPON) as filin:
+        for line in filin:
+            champs = line.split()
+            if champs:
+                yield champs[0].decode("latin-1"), int(champs[1])
+
+
+def is_count_file(fichier):
+    """Indique si un fichier de famille est au format compact.
+
+    Parameters
+    ----------
+    fichier : string
+        nom du fichier
+
+    Returns
+    -------
+    bool
+        True pour les fichiers family_N_count_seq.txt
+    """
+    return fichier.endswith("_count_seq.txt")
+
+
+def read_family(fichier):
+    """compte les séquences d'un fichier de famille, quel que soit son
+    format (une séquence par ligne, ou une séquence et son nombre
+    d'occurrences par ligne).
+
+    Parameters
+    ----------
+    fichier : string
+        fichier texte à lire
+
+    Returns
+    -------
+    compte: dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+        de la famille, dans l'ordre du fichier
+    """
+    if is_count_file(fichier):
+        compte = Counter()
+        for seq, nombre in read_counts(fichier):
+            compte[seq] += nombre
+        return compte
+
+    return count_sequences(read_lines(fichier))
+
+
+def family_number(fichier):
+    """Donne le numéro de famille contenu dans le nom d'un fichier
+    family_N_....txt.
+
+    Parameters
+    ----------
+    fichier : string
+        nom du fichier
+
+    Returns
+    -------
+    num_fam: int
+        le numéro de la famille
+    """
+    resultat = re.search(r"family_(\d+)_", os.path.basename(fichier))
+
+    if resultat is None:
+        sys.exit(f"Le fichier {fichier} n'est pas un fichier de famille (family_N_...)")
+
+    return int(resultat.group(1))
+
+
+def round_name(fichier):
+    """Donne le nom du round d'un fichier fasta Rxx.fastq_result.fas.
+
+    Parameters
+    ----------
+    fichier : string
+        nom du fichier, éventuellement précédé d'un dossier
+
+    Returns
+    -------
+    Round: string
+        le nom du round (R00, R01...)
+    """
+    return os.path.basename(fichier).split(".")[0]
@@ -0,0 +1,260 @@
+"""Ce module permet de trouver les séquences présentes un grand nombre
+de fois dans des fichiers fasta sans compter toutes les séquences.
+
+Un premier passage sur les fichiers alimente un count-min sketch de
+taille fixe et retient les séquences dont le nombre d'occurrences estimé
+atteint le seuil. Le sketch ne sous-estime jamais un compte : aucune
+séquence au-dessus du seuil n'est donc oubliée. Un second passage compte
+exactement ces seules candidates.
+
+Usage:
+------
+    from heavy_hitters import heavy_hitters
+
+    wanted_seq_all, compte_par_fichier = heavy_hitters(fichiers, 1000)
+"""
+
+
+############ Modules à importer ############
+
+
+import struct
+from array import array
+from hashlib import blake2b
+from collections import Counter
+from tqdm import tqdm
+from fasta_reader import read_fasta
+
+
+############################################
+
+
+LARGEUR = 1 << 22
+PROFONDEUR = 4
+TAILLE_BLOC = 1000000
+
+
+class CountMinSketch:
+    """Count-min sketch à mise à jour conservative.
+
+    La table contient profondeur lignes de largeur compteurs de 32 bits.
+    """
+
+    def __init__(self, largeur = LARGEUR, profondeur = PROFONDEUR):
+        """Crée un sketch vide.
+
+        Parameters
+        ----------
+        largeur : int
+            le nombre de compteurs par ligne, arrondi à la puissance de
+            deux supérieure
+
+        profondeur: int
+            le nombre de lignes, donc de fonctions de hachage
+        """
+        self.largeur = 1 << max(0, largeur - 1).bit_length()
+        self.masque = self.largeur - 1
+        self.profondeur = profondeur
+        self.format = f"<{profondeur}I"
+        self.table = [array("I", bytes(4 * self.largeur)) for i in range(profondeur)]
+
+    def _positions(self, seq):
+        """Donne la position de la séquence dans chaque ligne.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence
+
+        Returns
+        -------
+        positions: tuple
+            la position de la séquence dans chaque ligne de la table
+        """
+        empreinte = blake2b(seq.encode("latin-1"), digest_size = 4 * self.profondeur).digest()
+
+        return tuple(h & self.masque for h in struct.unpack(self.format, empreinte))
+
+    def ajouter(self, seq, nombre = 1):
+        """Ajoute des occurrences d'une séquence.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence
+
+        nombre: int
+            le nombre d'occurrences à ajouter
+
+        Returns
+        -------
+        estimation: int
+            le nombre d'occurrences estimé de la séquence après l'ajout
+        """
+        positions = self._positions(seq)
+        estimation = min(ligne[pos] for ligne, pos in zip(self.table, positions)) + nombre
+
+        for ligne, pos in zip(self.table, positions):
+            if ligne[pos] < estimation:
+                ligne[pos] = estimation
+
+        return estimation
+
+    def estimer(self, seq):
+        """Estime le nombre d'occurrences d'une séquence.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence
+
+        Returns
+        -------
+        estimation: int
+            une borne supérieure du nombre d'occurrences de la séquence
+        """
+        positions = self._positions(seq)
+
+        return min(ligne[pos] for ligne, pos in zip(self.table, positions))
+
+
+def add_block(sketch, bloc, seuil, candidats):
+    """Ajoute un bloc de lectures au sketch puis le vide.
+
+    Parameters
+    ----------
+    sketch : CountMinSketch
+        le sketch à alimenter
+
+    bloc: dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+        du bloc
+
+    seuil: int
+        le nombre minimum d'occurrences
+
+    candidats: set
+        ensemble complété par les séquences dont l'estimation atteint
+        le seuil
+    """
+    for seq, nombre in bloc.items():
+        if sketch.ajouter(seq, nombre) >= seuil:
+            candidats.add(seq)
+    bloc.clear()
+
+
+def find_candidates(fichiers, seuil, largeur = LARGEUR, profondeur = PROFONDEUR, taille_bloc = TAILLE_BLOC):
+    """Premier passage : trouve les séquences pouvant dépasser le seuil.
+
+    Les lectures sont regroupées par blocs de taille_bloc séquences,
+    comptées exactement dans le bloc puis ajoutées au sketch, ce qui
+    limite le nombre de calculs d'empreinte.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta à lire
+
+    seuil: int
+        le nombre minimum d'occurrences
+
+    largeur: int
+        le nombre de compteurs par ligne du sketch
+
+    profondeur: int
+        le nombre de lignes du sketch
+
+    taille_bloc: int
+        le nombre de lectures comptées avant d'alimenter le sketch
+
+    Returns
+    -------
+    candidats: set
+        ensemble contenant toutes les séquences présentes au moins seuil
+        fois, et quelques faux positifs.
+    """
+    sketch = CountMinSketch(largeur, profondeur)
+    candidats = set()
+
+    for fichier in fichiers:
+        bloc = Counter()
+        taille = 0
+        for seq in tqdm(read_fasta(fichier)):
+            bloc[seq] += 1
+            taille += 1
+            if taille == taille_bloc:
+                add_block(sketch, bloc, seuil, candidats)
+                taille = 0
+        add_block(sketch, bloc, seuil, candidats)
+
+    return candidats
+
+
+def count_candidates(fichiers, candidats):
+    """Second passage : compte exactement les séquences candidates.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta à lire
+
+    candidats: set
+        les séquences à compter
+
+    Returns
+    -------
+    compte_par_fichier: dictionnary
+        dictionnaire contenant pour chaque fichier le nombre d'occurrences
+        de chaque séquence candidate.
+    """
+    compte_par_fichier = {}
+
+    for fichier in fichiers:
+        compte_par_fichier[fichier] = Counter(seq for seq in tqdm(read_fasta(fichier)) if seq in candidats)
+
+    return compte_par_fichier
+
+
+def heavy_hitters(fichiers, seuil, largeur = LARGEUR, profondeur = PROFONDEUR, taille_bloc = TAILLE_BLOC):
+    """Trouve les séquences présentes au moins seuil fois dans l'ensemble
+    des fichiers, en mémoire bornée.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta à lire
+
+    seuil: int
+        le nombre minimum d'occurrences
+
+    largeur: int
+        le nombre de compteurs par ligne du sketch
+
+    profondeur: int
+        le nombre de lignes du sketch
+
+    taille_bloc: int
+        le nombre de lectures comptées avant d'alimenter le sketch
+
+    Returns
+    -------
+    wanted_seq: dictionnary
+        dictionnaire contenant toutes les séquences présentes à
+        seuil occurrences ou plus dans l'ensemble des fichiers.
+
+    compte_par_fichier: dictionnary
+        dictionnaire contenant pour chaque fichier le nombre d'occurrences
+        des séquences candidates. Toute séquence présente au moins seuil
+        fois dans un fichier y figure.
+    """
+    candidats = find_candidates(fichiers, seuil, largeur, profondeur, taille_bloc)
+    compte_par_fichier = count_candidates(fichiers, candidats)
+    del candidats
+
+    compte = Counter()
+    for compte_fichier in compte_par_fichier.values():
+        compte.update(compte_fichier)
+
+    wanted_seq = {seq: nombre for seq, nombre in compte.items() if nombre >= seuil}
+
+    return wanted_seq, compte_par_fichier
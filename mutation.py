@@ -1,25 +1,41 @@
 """Ce code permet de calculer l'entropie de Shannon à chaque position
 des séquences d'une famille à chaque round.
 
+Les profils de toutes les familles et de tous les rounds sont rangés dans
+un seul tableau numpy familles x rounds x positions x bases : les
+fréquences, l'entropie de chaque position et la différence moyenne entre
+deux séquences sont calculées pour tous les rounds en même temps. Si
+plusieurs familles sont renseignées, leurs entropies sont aussi écrites
+côte à côte dans shannon_entropy_par_famille.txt.
+
 Usage:
 ------
     python3 mutation.py arguments
 
     arguments: le ou les fichier.s texte à analyser
+    (profil_fam_N_in_Rxx.txt, créés par extract.py), ou le ou les
+    fichier.s binaire.s de profils créés par family_in_files.py
+    (profil_by_fam_in_round_....bin)
 """
 
 
 ############ Modules à importer ############
 
 
+import os
+import re
 import sys
-from tqdm import tqdm
 import math
+import numpy as np
+from profile_store import load_profiles
 
 
 ############################################
 
 
+BASES = "ACGT"
+
+
 def arguments():
     """Vérifier le format et le nombre d'arguments renseigné
 
@@ -33,8 +49,8 @@ def arguments():
         sys.exit("Veuillez renseigner au moins un fichier txt à lire")
     
     for index in range(1, len(sys.argv)):
-        if not sys.argv[index].endswith(".txt"):
-            sys.exit("Les fichiers renseignés doivent être au format txt")
+        if not sys.argv[index].endswith((".txt", ".bin")):
+            sys.exit("Les fichiers renseignés doivent être au format txt ou bin")
         fichiers.append(str(sys.argv[index]))
     
     return fichiers
@@ -56,131 +72,244 @@ def save_data(fichier):
 
     data = {}
     with open(fichier, "r") as filin:
-        lines = filin.readlines()
-        lines = filter(str.strip, lines)
-        for line in lines:
-            if line[0:2] not in data.keys():
-                data[line[0:2]] = {}
-                data[line[0:2]][line[3]] = int(line[4:20].strip())
-            if line[0:2] in data.keys():
-                data[line[0:2]][line[3]] = int(line[4:20].strip())
+        for line in filin:
+            champs = line.split()
+            if len(champs) == 3:
+                data.setdefault(champs[0], {})[champs[1]] = int(champs[2])
 
     return data
 
-def mutation(data, fichier, longueur_seq, seq_by_round):
-    """Calcule la différence moyenne entre les séquences.
+
+def profile_file_keys(fichier):
+    """Donne la famille et le round contenus dans le nom d'un fichier
+    profil_fam_N_in_Rxx.txt.
 
     Parameters
     ----------
-    data: dictionnary
-        dictionnaire contenant le profil de la famille pour le round donné
-
     fichier : string
-        fichier texte à lire
+        nom du fichier
 
-    longueur_seq: int
-        la longueur des séquences du fichier
+    Returns
+    -------
+    famille: string
+        le numéro de la famille
 
-    seq_by_round: dictionnary
-        dictionnaire contenant le nombre de séquences présentes par round
-        pour la famille testée
+    Round: string
+        le nom du round
+    """
+    resultat = re.search(r"fam_(\d+)_in_(R\d+)", os.path.basename(fichier))
+
+    if resultat is None:
+        sys.exit(f"Le fichier {fichier} n'est pas un fichier profil_fam_N_in_Rxx.txt")
+
+    return resultat.group(1), resultat.group(2)
+
+
+def create_profile_array(profils):
+    """range les profils de plusieurs familles à plusieurs rounds dans un
+    seul tableau.
+
+    Parameters
+    ----------
+    profils : dictionnary
+        dictionnaire contenant pour chaque famille et chaque round le
+        profil renvoyé par save_data
 
     Returns
     -------
-    diff_moy_seq: float
-        différence moyenne entre deux séquences pour la famille testée
+    comptes: numpy.ndarray
+        tableau familles x rounds x positions x bases contenant le nombre
+        de chaque base à chaque position
+
+    familles: list
+        les familles, dans l'ordre du tableau
+
+    rounds: list
+        les rounds, dans l'ordre du tableau
+
+    positions: list
+        les positions, dans l'ordre du tableau
+
+    alphabet: string
+        les bases, dans l'ordre du tableau (A, C, G, T puis les autres)
+
+    presents: numpy.ndarray
+        tableau familles x rounds indiquant les profils renseignés
     """
-    somme_base = 0
-    diff_moy_seq = 0
+    familles = sorted(profils.keys(), key = int)
+    rounds = sorted({Round for famille in familles for Round in profils[famille]})
+    positions = sorted({int(pos) for famille in familles for data in profils[famille].values() for pos in data})
+    autres = sorted({base for famille in familles for data in profils[famille].values()
+                     for valeur in data.values() for base in valeur} - set(BASES))
+    alphabet = BASES + "".join(autres)
 
-    taille_fam = seq_by_round[fichier[16:19]]
+    colonne_pos = {pos: j for j, pos in enumerate(positions)}
+    colonne_base = {base: k for k, base in enumerate(alphabet)}
+    comptes = np.zeros((len(familles), len(rounds), len(positions), len(alphabet)), dtype = np.int64)
+    presents = np.zeros((len(familles), len(rounds)), dtype = bool)
 
-    for cle, valeur in data.items():
-        for cle2, valeur2 in valeur.items():
-            tmp = valeur2 - 1
-            somme_base += valeur2 * tmp
+    for f, famille in enumerate(familles):
+        for r, Round in enumerate(rounds):
+            presents[f, r] = Round in profils[famille]
+            for pos, valeur in profils[famille].get(Round, {}).items():
+                for base, nombre in valeur.items():
+                    comptes[f, r, colonne_pos[int(pos)], colonne_base[base]] = nombre
 
-    tmp = taille_fam - 1
-    taille_fam = taille_fam * tmp
-    tmp = somme_base / taille_fam
-    diff_moy_seq = longueur_seq - tmp
+    return comptes, familles, rounds, positions, alphabet, presents
 
 
-    return diff_moy_seq
+def load_profile_array(fichiers, fam = ""):
+    """range les profils de fichiers binaires dans un seul tableau.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers binaires de profils
+
+    fam: string
+        le numéro de la famille à garder, ou une chaîne vide pour garder
+        toutes les familles
+
+    Returns
+    -------
+    les mêmes valeurs que create_profile_array
+    """
+    profils = []
+    alphabet = ""
+
+    for fichier in fichiers:
+        alphabet_fichier, entrees = load_profiles(fichier)
+        for base in alphabet_fichier:
+            if base not in alphabet:
+                alphabet += base
+        for famille, Round, decalage, tableau in entrees:
+            if not fam or str(famille) == fam:
+                profils.append((str(famille), Round, decalage, tableau, alphabet_fichier))
+
+    alphabet = BASES + "".join(sorted(set(alphabet) - set(BASES)))
+    familles = sorted({profil[0] for profil in profils}, key = int)
+    rounds = sorted({profil[1] for profil in profils})
+    debut = min((profil[2] for profil in profils), default = 0)
+    fin = max((profil[2] + len(profil[3]) for profil in profils), default = 0)
+    positions = list(range(debut, fin))
+
+    comptes = np.zeros((len(familles), len(rounds), len(positions), len(alphabet)), dtype = np.int64)
+    presents = np.zeros((len(familles), len(rounds)), dtype = bool)
+
+    for famille, Round, decalage, tableau, alphabet_fichier in profils:
+        f = familles.index(famille)
+        r = rounds.index(Round)
+        colonnes = [alphabet.index(base) for base in alphabet_fichier]
+        comptes[f, r, decalage - debut:decalage - debut + len(tableau)][:, colonnes] = tableau
+        presents[f, r] = True
+
+    return comptes, familles, rounds, positions, alphabet, presents
 
-    
 
-def frequence_par_round(data, seq_by_round):
-    """calcule la fréquence de base azotée par round.
+def count_seq_by_round(comptes):
+    """donne le nombre de séquences de chaque famille à chaque round.
 
     Parameters
     ----------
-    data: dictionnary
-        dictionnaire contenant le profil de la famille pour le round donné
+    comptes : numpy.ndarray
+        tableau ... x positions x bases renvoyé par create_profile_array
 
-    seq_by_round: dictionnary
-        dictionnaire contenant le nombre de séquences présentes par round
-        pour la famille testée       
+    Returns
+    -------
+    seq_by_round: numpy.ndarray
+        le nombre de séquences, compté à la position la plus remplie (les
+        positions ajoutées pour aligner les profils sont vides)
+    """
+    return comptes.sum(axis = -1).max(axis = -1)
+
+
+def profile_lengths(comptes):
+    """donne la longueur de chaque profil.
+
+    Les profils plus courts que le tableau sont complétés par des
+    positions vides : la longueur d'un profil est son nombre de positions
+    contenant au moins une base.
+
+    Parameters
+    ----------
+    comptes : numpy.ndarray
+        tableau ... x positions x bases renvoyé par create_profile_array
 
     Returns
     -------
-    freq_par_round: dictionnary
-        dictionnaire contenant la fréquence de chaque base azotée par round
-    """     
-    freq_par_round = {}
+    longueurs: numpy.ndarray
+        le nombre de positions de chaque profil
+    """
+    return (comptes.sum(axis = -1) > 0).sum(axis = -1)
 
-    bases = ["A", "T", "C", "G"]
 
-    for cle in seq_by_round.keys():
-        freq_par_round[cle] = {}
+def mutation(comptes, longueur_seq = None):
+    """Calcule la différence moyenne entre deux séquences de chaque
+    famille à chaque round.
 
-    for cle, valeur in data.items():
-        for cle2, valeur2 in valeur.items():
-            freq_par_round[cle][cle2] = {}
-            for cle3, valeur3 in valeur2.items():
-                taille = seq_by_round[cle]
-                freq_par_round[cle][cle2][cle3] = valeur3 / taille
-                for base in bases:
-                    if base not in valeur2.keys():
-                        freq_par_round[cle][cle2][base] = 0
+    Parameters
+    ----------
+    comptes : numpy.ndarray
+        tableau ... x positions x bases renvoyé par create_profile_array
 
+    longueur_seq: int
+        la longueur des séquences ; si elle n'est pas renseignée, la
+        longueur de chaque profil est utilisée
 
+    Returns
+    -------
+    diff_moy_seq: numpy.ndarray
+        différence moyenne entre deux séquences, nan pour les rounds
+        contenant moins de deux séquences
+    """
+    if longueur_seq is None:
+        longueur_seq = profile_lengths(comptes)
 
+    taille_fam = count_seq_by_round(comptes).astype(np.float64)
+    somme_base = (comptes * (comptes - 1)).sum(axis = (-2, -1))
+    paires = taille_fam * (taille_fam - 1)
+    diff_moy_seq = np.full(paires.shape, np.nan)
+    np.subtract(longueur_seq, somme_base / np.where(paires > 0, paires, 1), out = diff_moy_seq, where = paires > 0)
 
-    return freq_par_round
+    return diff_moy_seq
 
 
-def calc_shannon_entropy(freq_par_round):
-    """calcule l'entropie de Shannon pour chaque position.
+def frequence_par_round(comptes):
+    """calcule la fréquence de chaque base à chaque position.
 
     Parameters
     ----------
-    freq_par_round: dictionnary
-        dictionnaire contenant la fréquence de chaque base azotée par round
+    comptes : numpy.ndarray
+        tableau ... x positions x bases renvoyé par create_profile_array
 
     Returns
     -------
-    entropy_dict: dictionnary
-        dictionnaire contenant l'entropie de Shannon pour chaque position
-    """ 
-    entropy_dict = {}
-    base = 4
-    entropy = 0
+    freq_par_round: numpy.ndarray
+        tableau de même forme contenant la fréquence de chaque base
+    """
+    taille = count_seq_by_round(comptes)[..., np.newaxis, np.newaxis]
+
+    return comptes / np.where(taille > 0, taille, 1)
+
+
+def calc_shannon_entropy(freq_par_round):
+    """calcule l'entropie de Shannon (en base 4) à chaque position.
+
+    Parameters
+    ----------
+    freq_par_round: numpy.ndarray
+        tableau renvoyé par frequence_par_round
 
-    for cle, valeur in frequence.items():
-        entropy_dict[cle] = {}
-        for cle2, valeur2 in valeur.items():
-            entropy_dict[cle][cle2] = {}
-            for cle3, valeur3 in valeur2.items():
-                if valeur3 == 0:
-                    continue
-                else:
-                    entropy += - valeur3 * math.log(valeur3, base)
-            entropy_dict[cle][cle2] = entropy
-            entropy = 0
+    Returns
+    -------
+    entropy: numpy.ndarray
+        tableau ... x positions contenant l'entropie de chaque position
+    """
+    termes = np.zeros_like(freq_par_round)
+    np.log(freq_par_round, out = termes, where = freq_par_round > 0)
 
+    return - (freq_par_round * termes).sum(axis = -1) / math.log(4)
 
-    return entropy_dict
 
 def save_data_nested_dic(fichier, dictionnaire):
     """sauvegarde un dictionnaire imbriqué dans un fichier texte.
@@ -202,58 +331,84 @@ def save_data_nested_dic(fichier, dictionnaire):
                 filout.write("{} {}\n".format(cle, valeur))
 
 
+def save_results(comptes, familles, rounds, positions, alphabet, presents, longueur_seq = None):
+    """calcule et sauvegarde la différence moyenne entre deux séquences,
+    l'entropie et la fréquence des bases à chaque position de chaque
+    famille à chaque round.
+
+    Seules les positions de chaque profil sont écrites : les positions
+    ajoutées pour aligner un profil sur les plus longs ne le sont pas.
+
+    Parameters
+    ----------
+    comptes, familles, rounds, positions, alphabet, presents:
+        les valeurs renvoyées par create_profile_array
+
+    longueur_seq: int
+        la longueur des séquences ; si elle n'est pas renseignée, la
+        longueur de chaque profil est utilisée
+    """
+    diff_moy_seq = mutation(comptes, longueur_seq)
+    freq_par_round = frequence_par_round(comptes)
+    entropy = calc_shannon_entropy(freq_par_round)
+    occupees = comptes.sum(axis = -1) > 0
+
+    for f, famille in enumerate(familles):
+        rounds_famille = np.flatnonzero(presents[f]).tolist()
+
+        diff_moy = f"difference_moy_entre_deux_seq_fam_{famille}.txt"
+        save_data_nested_dic(diff_moy, {rounds[r]: diff_moy_seq[f, r].item() for r in rounds_famille})
+
+        for r in rounds_famille:
+            colonnes = np.flatnonzero(occupees[f, r]).tolist()
+            entropy_file = f"shannon_entropy_fam_{famille}_{rounds[r]}.txt"
+            save_data_nested_dic(entropy_file, {positions[j]: entropy[f, r, j].item() for j in colonnes})
+
+            frequences = {}
+            for j in colonnes:
+                pos = positions[j]
+                frequences[pos] = {base: freq for base, freq, nombre in zip(alphabet, freq_par_round[f, r, j].tolist(), comptes[f, r, j].tolist())
+                                   if base in BASES or nombre}
+                frequences[pos] = dict(sorted(frequences[pos].items(), key = lambda t: t[0]))
+            freq = f"frequence_par_pos_{rounds[r]}_fam_{famille}.txt"
+            save_data_nested_dic(freq, frequences)
+
+    if len(familles) > 1:
+        with open("shannon_entropy_par_famille.txt", "w") as filout:
+            filout.write("round position {}\n".format(" ".join(f"famille_{famille}" for famille in familles)))
+            for r, Round in enumerate(rounds):
+                for j, pos in enumerate(positions):
+                    valeurs = " ".join(str(valeur) if occupee else "nan"
+                                       for valeur, occupee in zip(entropy[:, r, j].tolist(), occupees[:, r, j].tolist()))
+                    filout.write(f"{Round} {pos} {valeurs}\n")
+
 
 def main():
     """Le main du programme."""    
     
-    fam = input("Quelle famille voulez vous traiter ? ")
-    longueur_seq = input("Quelle est la longueur des séquences ? ")
-    rounds = []
+    fam = input("Quelle famille voulez vous traiter ? (un numéro, ou rien pour toutes les familles) ").strip()
+    longueur_seq = input("Quelle est la longueur des séquences ? (rien pour le nombre de positions de chaque profil) ").strip()
     fichiers = arguments()
 
-    seq_by_round = {"R00" : 0, "R01" : 0,
-    "R02" : 0, "R03" : 0, "R04" : 0, "R05" : 0,
-    "R06" : 0, "R07" : 0, "R08" : 0, "R09" : 0, "R10" : 0,
-    "R11" : 0, "R12" : 0, "R13" : 0, "R14" : 0, "R15" : 0,
-    "R17" : 0, "R18" : 0}
-
-    for fichier in fichiers:
-        rounds.append(fichier[16:19])
-   
-    profil_par_round = {}.fromkeys(set(rounds), {})
-    diff_moy_seq = {}.fromkeys(set(rounds), {})
-
+    if all(fichier.endswith(".bin") for fichier in fichiers):
+        comptes, familles, rounds, positions, alphabet, presents = load_profile_array(fichiers, fam)
 
-    for fichier in fichiers:
-        data = save_data(fichier)
-        for cle, valeur in data["24"].items():
-            seq_by_round[fichier[16:19]] += valeur
-        profil_par_round[fichier[16:19]] = data
-        diff_moy_seq[fichier[16:19]] = mutation(data, fichier, longueur_seq, seq_by_round)
+    else:
+        profils = {}
+        for fichier in fichiers:
+            famille, Round = profile_file_keys(fichier)
+            if fam and famille != fam:
+                continue
+            profils.setdefault(famille, {})[Round] = save_data(fichier)
+        comptes, familles, rounds, positions, alphabet, presents = create_profile_array(profils)
 
+    if not familles:
+        sys.exit(f"Aucun profil de la famille {fam} n'a été renseigné")
 
-    diff_moy_seq = dict(sorted(diff_moy_seq.items(), key = lambda t: t[0]))
-    diff_moy = f"difference_moy_entre_deux_seq_fam_{fam}.txt"
-    save_data_nested_dic(diff_moy, diff_moy_seq)
+    longueur_seq = int(longueur_seq) if longueur_seq else None
 
-
-    freq_par_round = frequence_par_round(profil_par_round, seq_by_round)
-    entropy_dict = calc_shannon_entropy(freq_par_round)
-    
-    for cle in entropy_dict.keys():    
-        entropy_file = f"shannon_entropy_fam_{fam}_{cle}.txt"
-        save_data_nested_dic(entropy_file, entropy_dict[cle])
-    
-    freq_par_round = dict(sorted(freq_par_round.items(), key = lambda t: t[0]))
-    
-    for k, v in freq_par_round.items():
-        for k2, v2 in v.items():
-            freq_par_round[k][k2] = dict(sorted(freq_par_round[k][k2].items(), key = lambda t: t[0]))
-    
-    for cle in freq_par_round.keys():
-        freq = f"frequence_par_pos_{cle}_fam_{fam}.txt"
-        save_data_nested_dic(freq, freq_par_round[cle])
+    save_results(comptes, familles, rounds, positions, alphabet, presents, longueur_seq)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
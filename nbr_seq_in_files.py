@@ -1,10 +1,19 @@
 """Ce code permet d'extraire la taille des familles créées.
 
+Les fichiers sont projetés en mémoire et comptés par blocs (voir
+record_counter.py), plusieurs à la fois avec --threads.
+
 Usage:
 ------
-    python3 nbr_seq_in_files.py arguments
+    python3 nbr_seq_in_files.py arguments [--threads N] [--uniques]
 
     arguments: fichier texte contenant des séquences nucléiques d'une famille
+    (family_N_diff_seq.txt, family_N_all_seq.txt ou family_N_count_seq.txt),
+    ou fichier fasta d'un round (Rxx.fastq_result.fas)
+
+    --threads N: nombre de fichiers comptés en même temps (1 par défaut)
+
+    --uniques: compte aussi les séquences différentes de chaque fichier
 
 """
 
@@ -13,6 +22,8 @@ Usage:
 
 
 import sys
+from fasta_reader import family_number, round_name
+from record_counter import count_file, count_files, is_fasta_file
 
 
 ############################################
@@ -24,18 +35,38 @@ def arguments():
     Returns
     -------
     fichiers: liste de tous les fichiers donnés en argument
+
+    options: dictionnary
+        dictionnaire contenant le nombre de threads et si les séquences
+        différentes doivent être comptées
     """  
     fichiers = []
+    options = {"threads": 1, "uniques": False}
     
     if len(sys.argv) < 2:
         sys.exit("Veuillez renseigner au moins un fichier texte à lire")
     
-    for index in range(1, len(sys.argv)):
-        if not sys.argv[index].endswith(".txt"):
-            sys.exit("Les fichiers renseignés doivent être au format texte")
+    index = 1
+    while index < len(sys.argv):
+        if sys.argv[index] == "--threads":
+            if index + 1 >= len(sys.argv) or not sys.argv[index + 1].isdigit() or int(sys.argv[index + 1]) < 1:
+                sys.exit("--threads doit être suivi d'un nombre de threads")
+            options["threads"] = int(sys.argv[index + 1])
+            index += 2
+            continue
+        if sys.argv[index] == "--uniques":
+            options["uniques"] = True
+            index += 1
+            continue
+        if not sys.argv[index].endswith(".txt") and not is_fasta_file(sys.argv[index]):
+            sys.exit("Les fichiers renseignés doivent être au format texte ou fasta")
         fichiers.append(str(sys.argv[index]))
+        index += 1
+
+    if not fichiers:
+        sys.exit("Veuillez renseigner au moins un fichier texte à lire")
     
-    return fichiers
+    return fichiers, options
 
 
 def save_data(fichier):
@@ -44,20 +75,16 @@ def save_data(fichier):
     Parameters
     ----------
     fichier : string
-        fichier texte à lire
+        fichier texte ou fasta à lire
 
     Returns
     -------
     nbr_ligne: int
-        nombre de séquences dans le fichier
+        nombre de séquences dans le fichier. Pour un fichier
+        family_N_count_seq.txt, c'est la somme des nombres d'occurrences.
     """    
-    nbr_ligne = 0
-    
-    with open(fichier, "r") as filin:
-        lines = filin.readlines()
-        for line in lines:
-            nbr_ligne += 1
-    
+    nbr_ligne, nbr_uniques = count_file(fichier)
+
     return nbr_ligne
 
 def save_in_text_file(data, fichier):
@@ -79,7 +106,8 @@ def save_in_text_file(data, fichier):
 def main():
     """Le main du programme."""
     nbr_seq_in_files = {}
-    fichiers = arguments()
+    nbr_uniques_in_files = {}
+    fichiers, options = arguments()
 
 #    for fichier in fichiers:
 #        if len(sys.argv) > 2:
@@ -91,16 +119,29 @@ def main():
 #            nbr_seq = save_data(fichier)
 #            nbr_seq_in_files["nbr_seq_supp_to_1000_all_rounds"] = nbr_seq
 
-    for fichier in fichiers:
+    comptes = count_files(fichiers, options["threads"], options["uniques"])
+
+    if all(is_fasta_file(fichier) for fichier in fichiers):
+        text_file = "nbr_seq_par_round.txt"
+        uniques_file = "nbr_seq_uniques_par_round.txt"
+    else:
         text_file = "taille_des_familles.txt"
-        nbr_seq = save_data(fichier)
-        if fichier.endswith("_diff_seq.txt"):
-            nbr_seq_in_files[fichier.strip("family__diff_seq.txt")] = nbr_seq
-        if fichier.endswith("_all_seq.txt"):
-            nbr_seq_in_files[fichier.strip("family__all_seq.txt")] = nbr_seq
+        uniques_file = "nbr_seq_uniques_des_familles.txt"
+
+    for fichier in fichiers:
+        if is_fasta_file(fichier):
+            cle = round_name(fichier)
+        elif fichier.endswith(("_diff_seq.txt", "_all_seq.txt", "_count_seq.txt")):
+            cle = family_number(fichier)
+        else:
+            continue
+        nbr_seq_in_files[cle], nbr_uniques_in_files[cle] = comptes[fichier]
 
     save_in_text_file(nbr_seq_in_files, text_file)
 
+    if options["uniques"]:
+        save_in_text_file(nbr_uniques_in_files, uniques_file)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
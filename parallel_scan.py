@@ -0,0 +1,136 @@
+"""Ce module permet de répartir la recherche des séquences d'une famille
+sur plusieurs processus.
+
+Les séquences sont découpées en autant de parts que de processus et
+envoyées une seule fois à leur création. Pour chaque nouvelle famille,
+seule la séquence de référence et la liste des séquences retirées depuis
+la recherche précédente sont transmises.
+
+Usage:
+------
+    from parallel_scan import ScanParallele
+
+    scan = ScanParallele(sequences, workers)
+    voisins = scan.voisins(seq_max, dist_max)
+    scan.retirer(seq_max)
+    scan.fermer()
+"""
+
+
+############ Modules à importer ############
+
+
+import heapq
+import multiprocessing
+from bounded_distance import distance_bornee
+
+
+############################################
+
+
+def _travailleur(connexion, part):
+    """Boucle d'un processus de recherche.
+
+    Parameters
+    ----------
+    connexion : multiprocessing.connection.Connection
+        connexion avec le processus parent
+
+    part: list
+        liste de tuple (rang, séquence) confiée à ce processus, triée
+        par rang
+    """
+    vivantes = {seq: rang for rang, seq in part}
+
+    while True:
+        message = connexion.recv()
+        if message is None:
+            break
+        seq_max, dist_max, retirees = message
+        for seq in retirees:
+            vivantes.pop(seq, None)
+        trouvees = [(rang, seq) for seq, rang in vivantes.items()
+                    if distance_bornee(seq, seq_max, dist_max) <= dist_max]
+        connexion.send(trouvees)
+
+    connexion.close()
+
+
+class ScanParallele:
+    """Recherche des séquences proches répartie sur plusieurs processus."""
+
+    def __init__(self, sequences, workers):
+        """Démarre les processus et leur envoie leur part des séquences.
+
+        Parameters
+        ----------
+        sequences : iterable
+            les séquences à répartir, dans l'ordre qui servira à trier
+            les résultats de la recherche
+
+        workers: int
+            le nombre de processus
+        """
+        parts = [[] for i in range(workers)]
+
+        for rang, seq in enumerate(sequences):
+            parts[rang % workers].append((rang, seq))
+
+        self.retirees = []
+        self.connexions = []
+        self.processus = []
+
+        for part in parts:
+            parent, enfant = multiprocessing.Pipe()
+            processus = multiprocessing.Process(target = _travailleur, args = (enfant, part), daemon = True)
+            processus.start()
+            enfant.close()
+            self.connexions.append(parent)
+            self.processus.append(processus)
+
+    def retirer(self, seq):
+        """Retire une séquence des résultats de recherche.
+
+        Le retrait est transmis aux processus avec la recherche suivante.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence à retirer
+        """
+        self.retirees.append(seq)
+
+    def voisins(self, seq, dist_max):
+        """Donne les séquences à une distance inférieure ou égale à dist_max.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence de référence
+
+        dist_max: int
+            la distance de Levenshtein maximum
+
+        Returns
+        -------
+        voisins: list
+            liste des séquences non retirées proches de seq, triées
+            dans l'ordre initial des séquences.
+        """
+        for connexion in self.connexions:
+            connexion.send((seq, dist_max, self.retirees))
+        self.retirees = []
+
+        resultats = [connexion.recv() for connexion in self.connexions]
+
+        return [cle for rang, cle in heapq.merge(*resultats)]
+
+    def fermer(self):
+        """Arrête les processus."""
+        for connexion in self.connexions:
+            connexion.send(None)
+            connexion.close()
+        for processus in self.processus:
+            processus.join()
+        self.connexions = []
+        self.processus = []
@@ -0,0 +1,604 @@
+"""Ce code permet d'enchaîner toute l'analyse dans un seul processus :
+création des familles (create_family.py), taille des familles
+(nbr_seq_in_files.py), entropie (entropy.py), profils (profils.py),
+comparaison des familles aux rounds (family_in_files.py), extraction des
+profils (extract.py) et mutations (mutation.py).
+
+Chaque étape reçoit directement les comptages, les familles et les profils
+calculés par l'étape précédente, sans relire de fichier texte : chaque
+fichier fasta n'est lu qu'une fois. Seuls les résultats sont écrits ; les
+fichiers intermédiaires que les scripts s'échangent habituellement ne sont
+écrits qu'avec --intermediaires. Tous les paramètres sont donnés en ligne
+de commande : aucune question n'est posée.
+
+Usage:
+------
+    python3 pipeline.py --dist-max N --familles N [options] arguments
+
+    arguments: le ou les fichier.s fasta à analyser (Rxx.fastq_result.fas)
+
+    paramètres obligatoires:
+        --dist-max N: la distance de Levenshtein maximum entre deux
+        séquences pour former une famille
+
+        --familles N: le nombre de familles souhaité
+
+    options:
+        --seuil N, --bktree, --workers N, --heavy-hitters, --store DOSSIER:
+        les options de create_family.py ; --workers s'applique aussi à la
+        lecture des rounds
+
+        --dist-max-rounds N: l'option --dist-max de family_in_files.py
+
+        --rarefy N, --replicates R, --random-seed S: les options de
+        entropy.py
+
+        --longueur N: la longueur des séquences pour mutation.py (le
+        nombre de positions de chaque profil par défaut)
+
+        --intermediaires: écrit aussi les fichiers intermédiaires
+        (Rxx_kept_data.txt, family_N_count_seq.txt, tables de fréquence,
+        profils texte de chaque famille à chaque round...)
+
+        --cache DOSSIER: garde dans ce dossier le comptage de chaque round,
+        les familles et la comparaison des familles à chaque round ; une
+        nouvelle exécution ne recalcule que les étapes dont les entrées
+        (fichiers et paramètres) ont changé
+
+        --hash-contenu: avec --cache, reconnaît les fichiers fasta à
+        l'empreinte de leur contenu plutôt qu'à leur taille et leur date
+        de modification
+"""
+
+
+############ Modules à importer ############
+
+
+import sys
+from collections import Counter
+from create_family import (count_rounds, count_store_rounds, kept_all, kept_data, create_families,
+                           save_data_in_txt_file, save_one_key_dict_in_txt_file, heavy_hitters_warning,
+                           EN_TETE_HEAVY_HITTERS)
+from heavy_hitters import heavy_hitters
+from fasta_reader import read_fasta, count_sequences, round_name
+from entropy import (count_table, calc_all_shannon_entropy, batch_entropy, rarefy_entropy,
+                     save_rarefied_entropy, save_dict)
+from profils import compte_seq_len, extract_max_from_dict, create_profils, save_profil
+from family_in_files import count_file_seq_in_family, save_data_in_text_file, save_data_of_nested_dic
+from extract import save_dict_in_txt_file, save_data_in_txt_file as save_list_in_txt_file
+from mutation import create_profile_array, save_results
+from profile_store import save_profiles
+from stage_cache import StageCache
+from count_store import CountStore
+
+
+############################################
+
+
+def read_number(index, option):
+    """Lit le nombre qui suit une option.
+
+    Parameters
+    ----------
+    index : int
+        la position du nombre dans sys.argv
+
+    option: string
+        le nom de l'option, pour le message d'erreur
+
+    Returns
+    -------
+    nombre: int
+        le nombre lu
+    """
+    if index == len(sys.argv) or not sys.argv[index].isdigit():
+        sys.exit(f"L'option {option} doit être suivie d'un nombre")
+
+    return int(sys.argv[index])
+
+
+def arguments():
+    """Vérifier le format et le nombre d'arguments renseigné.
+
+    Returns
+    -------
+    fichiers: liste de tous les fichiers donnés en argument.
+
+    options: dictionnaire contenant les options renseignées en argument.
+    """
+
+    fichiers = []
+    options = {"dist_max": None, "nombre_famille": None, "seuil": 1000, "bktree": False, "workers": 1,
+               "heavy_hitters": False, "store": None, "dist_max_rounds": None, "rarefy": None,
+               "replicates": 100, "random_seed": 0, "longueur": None, "intermediaires": False,
+               "cache": None, "hash_contenu": False}
+    nombres = {"--dist-max": "dist_max", "--familles": "nombre_famille", "--seuil": "seuil",
+               "--workers": "workers", "--dist-max-rounds": "dist_max_rounds", "--rarefy": "rarefy",
+               "--replicates": "replicates", "--random-seed": "random_seed", "--longueur": "longueur"}
+    drapeaux = {"--bktree": "bktree", "--heavy-hitters": "heavy_hitters", "--intermediaires": "intermediaires",
+                 "--hash-contenu": "hash_contenu"}
+
+    index = 1
+
+    while index < len(sys.argv):
+        if sys.argv[index] in nombres:
+            index += 1
+            options[nombres[sys.argv[index - 1]]] = read_number(index, sys.argv[index - 1])
+        elif sys.argv[index] in drapeaux:
+            options[drapeaux[sys.argv[index]]] = True
+        elif sys.argv[index] in ("--store", "--cache"):
+            index += 1
+            if index == len(sys.argv):
+                sys.exit(f"L'option {sys.argv[index - 1]} doit être suivie d'un nom de dossier")
+            options[sys.argv[index - 1][2:]] = sys.argv[index]
+        elif not sys.argv[index].endswith(".fas"):
+            sys.exit("Les fichiers renseignés doivent être au format fasta")
+        else:
+            fichiers.append(str(sys.argv[index]))
+        index += 1
+
+    if not fichiers:
+        sys.exit("Veuillez renseigner au moins un fichier fasta à lire")
+
+    if options["dist_max"] is None or options["nombre_famille"] is None:
+        sys.exit("Les options --dist-max et --familles sont obligatoires")
+
+    if options["workers"] < 1 or options["rarefy"] == 0 or options["replicates"] < 1:
+        sys.exit("Les options --workers, --rarefy et --replicates doivent être supérieures à 0")
+
+    return fichiers, options
+
+
+def round_count(fichier, cache = None):
+    """compte les séquences d'un round, ou relit leur comptage dans le cache.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier fasta du round
+
+    cache: StageCache
+        si renseigné, le comptage du round y est relu, ou gardé s'il n'y
+        est pas encore
+
+    Returns
+    -------
+    compte: dictionnary
+        dictionnaire de comptage des séquences du round
+    """
+    if cache is None:
+        return count_sequences(read_fasta(fichier))
+
+    cle = cache.key("comptage", [fichier])
+    compte = cache.get("comptage", cle)
+    if compte is None:
+        compte = count_sequences(read_fasta(fichier))
+        cache.put("comptage", cle, compte)
+
+    return compte
+
+
+def count_stage(fichiers, options, cache = None):
+    """compte les séquences de tous les rounds, comme create_family.py.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta
+
+    options: dictionnary
+        les options renvoyées par arguments
+
+    cache: StageCache
+        si renseigné, le comptage de chaque round y est gardé : seuls les
+        rounds nouveaux ou modifiés sont comptés
+
+    Returns
+    -------
+    compte_all: dictionnary
+        dictionnaire de comptage des séquences utilisées pour créer les
+        familles
+
+    wanted_par_fichier: dictionnary
+        dictionnaire contenant pour chaque fichier les séquences présentes à
+        seuil occurrences ou plus dans ce fichier
+
+    wanted_seq_all: dictionnary
+        dictionnaire contenant les séquences présentes à seuil occurrences
+        ou plus dans tous les fichiers
+
+    comptes_par_fichier: dictionnary
+        dictionnaire contenant le comptage de chaque fichier, repris par
+        round_stage pour ne pas relire les fichiers fasta ; None avec
+        --heavy-hitters (seules les séquences candidates sont comptées) et
+        avec --store (les comptages sont relus dans le dossier : les
+        fichiers fasta ne sont lus que par round_stage)
+    """
+    seuil = options["seuil"]
+
+    if options["heavy_hitters"]:
+        wanted_seq_all, compte_par_fichier = heavy_hitters(fichiers, seuil)
+        wanted_par_fichier = {}
+        for fichier in fichiers:
+            wanted_par_fichier[fichier] = kept_data(compte_par_fichier.pop(fichier), seuil)
+        return wanted_seq_all, wanted_par_fichier, wanted_seq_all, None
+
+    comptes_par_fichier = None
+
+    if options["store"] is not None:
+        compte_all, wanted_par_fichier = count_store_rounds(fichiers, options["store"], seuil)
+    elif cache is not None:
+        compte_all = Counter()
+        wanted_par_fichier = {}
+        comptes_par_fichier = {}
+        for fichier in fichiers:
+            compte = round_count(fichier, cache)
+            wanted_par_fichier[fichier] = kept_data(compte, seuil)
+            compte_all.update(compte)
+            comptes_par_fichier[fichier] = compte
+    else:
+        comptes_par_fichier = {}
+        compte_all, wanted_par_fichier = count_rounds(fichiers, seuil, options["workers"], comptes_par_fichier)
+
+    wanted_seq_all, compte_all = kept_all(compte_all, seuil)
+
+    return compte_all, wanted_par_fichier, wanted_seq_all, comptes_par_fichier
+
+
+def truncate_families(familles, nombre_famille):
+    """garde les premières familles d'un résultat de create_families.
+
+    Les familles sont créées une à une par ordre d'abondance : les
+    nombre_famille premières familles d'une exécution demandant plus de
+    familles sont celles qu'aurait donné une exécution demandant
+    nombre_famille familles.
+
+    Parameters
+    ----------
+    familles : tuple
+        les dictionnaires renvoyés par create_families
+
+    nombre_famille: int
+        le nombre de familles à garder
+
+    Returns
+    -------
+    familles: tuple
+        les mêmes dictionnaires, limités aux nombre_famille premières
+        familles
+    """
+    fam_seq, seq_fam, fam_seq_compte, seq_ref = familles
+    garde = set(list(fam_seq)[:nombre_famille])
+
+    return ({num_fam: seq_list for num_fam, seq_list in fam_seq.items() if num_fam in garde},
+            {seq: num_fam for seq, num_fam in seq_fam.items() if num_fam in garde},
+            {num_fam: compte for num_fam, compte in fam_seq_compte.items() if num_fam in garde},
+            {num_fam: ref for num_fam, ref in seq_ref.items() if num_fam in garde})
+
+
+def cached_families(cache, cle, nombre_famille):
+    """relit les familles gardées dans le cache.
+
+    Parameters
+    ----------
+    cache : StageCache
+        le cache
+
+    cle: string
+        la clé de l'étape de création des familles, qui ne dépend pas du
+        nombre de familles
+
+    nombre_famille: int
+        le nombre de familles voulu
+
+    Returns
+    -------
+    familles: tuple
+        les dictionnaires renvoyés par create_families, ou None si le cache
+        contient moins de familles que demandé
+    """
+    resultat = cache.get("familles", cle)
+
+    if resultat is None:
+        return None
+
+    nombre_cache, familles = resultat
+    epuisees = len(familles[0]) < nombre_cache
+
+    if nombre_famille > nombre_cache and not epuisees:
+        return None
+
+    return truncate_families(familles, nombre_famille)
+
+
+def family_sizes(fam_seq_compte):
+    """donne la taille de chaque famille, comme nbr_seq_in_files.py.
+
+    Parameters
+    ----------
+    fam_seq_compte : dictionnary
+        dictionnaire contenant pour chaque famille le nombre d'occurrences
+        de chacune de ses séquences
+
+    Returns
+    -------
+    tailles: dictionnary
+        dictionnaire contenant le nombre de séquences de chaque famille
+    """
+    return {num_fam: sum(compte.values()) for num_fam, compte in fam_seq_compte.items()}
+
+
+def entropy_stage(fam_seq_compte, options):
+    """calcule l'entropie de Shannon de chaque famille, comme
+    entropy.py --batch.
+
+    Parameters
+    ----------
+    fam_seq_compte : dictionnary
+        dictionnaire contenant pour chaque famille le nombre d'occurrences
+        de chacune de ses séquences
+
+    options: dictionnary
+        les options renvoyées par arguments
+
+    Returns
+    -------
+    entropy_dict: dictionnary
+        dictionnaire contenant l'entropie de Shannon de chaque famille
+    """
+    familles, sequences, nombres, debuts = count_table(fam_seq_compte)
+
+    if options["rarefy"] is not None and familles:
+        moyennes, bas, hauts = rarefy_entropy(nombres, debuts, options["rarefy"], options["replicates"], options["random_seed"])
+        rarefy_file = "shannon_entropy_rarefy_{}.txt".format(options["rarefy"])
+        save_rarefied_entropy(familles, moyennes, bas, hauts, rarefy_file)
+
+    if options["intermediaires"]:
+        return batch_entropy(familles, sequences, nombres, debuts)
+
+    if not familles:
+        return {}
+
+    entropies, frequences, uniques = calc_all_shannon_entropy(nombres, debuts)
+
+    return dict(zip(familles, entropies.tolist()))
+
+
+def family_profile_stage(fam_seq_compte, intermediaires = False):
+    """créer le profil de chaque famille tous rounds confondus, comme
+    profils.py.
+
+    Parameters
+    ----------
+    fam_seq_compte : dictionnary
+        dictionnaire contenant pour chaque famille le nombre d'occurrences
+        de chacune de ses séquences
+
+    intermediaires: bool
+        si True, écrit aussi les fichiers texte de profils.py
+
+    Returns
+    -------
+    profils_familles: dictionnary
+        dictionnaire contenant le profil de chaque famille, avec en clé le
+        couple (famille, "")
+    """
+    profils_familles = {}
+
+    for num_fam, data in fam_seq_compte.items():
+        compte = dict(sorted(compte_seq_len(data).items(), key = lambda t: t[0]))
+        profil = create_profils(compte, extract_max_from_dict(compte), data)
+        profils_familles[(num_fam, "")] = profil
+        if intermediaires:
+            save_data_in_txt_file(compte, "nbr_seq_len_family_{}.txt".format(num_fam))
+            save_profil(profil, "profil_famille_{}.txt".format(num_fam))
+
+    return profils_familles
+
+
+def round_stage(fam_seq, fichiers, options, cache = None, comptes = None):
+    """compare les familles aux séquences de chaque round, comme
+    family_in_files.py.
+
+    Parameters
+    ----------
+    fam_seq : dictionnary
+        dictionnaire contenant la liste des séquences de chaque famille,
+        la séquence de référence en premier
+
+    fichiers: list
+        liste des fichiers fasta de chaque round
+
+    options: dictionnary
+        les options renvoyées par arguments
+
+    cache: StageCache
+        si renseigné, le résultat de chaque round y est gardé : seuls les
+        rounds nouveaux ou modifiés sont relus, tant que les familles ne
+        changent pas
+
+    comptes: dictionnary
+        le comptage de chaque fichier renvoyé par count_stage ; les fichiers
+        fasta comptés ne sont pas relus
+
+    Returns
+    -------
+    les dictionnaires renvoyés par count_file_seq_in_family
+    """
+    if cache is None:
+        return count_file_seq_in_family(fam_seq, fichiers, options["workers"], options["dist_max_rounds"],
+                                        comptes = comptes)
+
+    parametres = {"familles": cache.digest(list(fam_seq.items())), "dist_max": options["dist_max_rounds"]}
+    cles = {fichier: cache.key("round", [fichier], parametres) for fichier in fichiers}
+    resultats = {fichier: cache.get("round", cles[fichier]) for fichier in fichiers}
+    a_calculer = [fichier for fichier in fichiers if resultats[fichier] is None]
+
+    if a_calculer:
+        if comptes is None and not options["heavy_hitters"] and options["store"] is None:
+            comptes = {fichier: round_count(fichier, cache) for fichier in a_calculer}
+        calcules = count_file_seq_in_family(fam_seq, a_calculer, options["workers"], options["dist_max_rounds"],
+                                            comptes = comptes)
+        for fichier in a_calculer:
+            Round = round_name(fichier)
+            resultats[fichier] = tuple(dictionnaire[Round] for dictionnaire in calcules)
+            cache.put("round", cles[fichier], resultats[fichier])
+
+    nbr_seq_in_families = {}
+    freq_seq_in_families = {}
+    profils = {}
+    compte = {}
+
+    for fichier in fichiers:
+        Round = round_name(fichier)
+        nbr_seq_in_families[Round], freq_seq_in_families[Round], profils[Round], compte[Round] = resultats[fichier]
+
+    return nbr_seq_in_families, freq_seq_in_families, profils, compte
+
+
+def round_profiles(profils):
+    """range les profils des familles à chaque round par famille.
+
+    Parameters
+    ----------
+    profils : dictionnary
+        dictionnaire contenant pour chaque round le profil de chaque
+        famille, renvoyé par round_stage
+
+    Returns
+    -------
+    profils_par_famille: dictionnary
+        dictionnaire contenant pour chaque famille son profil à chaque
+        round où elle est présente
+    """
+    profils_par_famille = {}
+
+    for Round, profils_round in profils.items():
+        for num_fam, profil in profils_round.items():
+            if isinstance(profil, dict):
+                profils_par_famille.setdefault(str(num_fam), {})[Round] = profil
+
+    return profils_par_famille
+
+
+def save_family_files(fichiers, wanted_par_fichier, wanted_seq_all, fam_seq, fam_seq_compte, seuil, en_tete = None):
+    """écrit les fichiers intermédiaires de create_family.py.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers fasta
+
+    wanted_par_fichier, wanted_seq_all: dictionnary
+        les dictionnaires renvoyés par count_stage
+
+    fam_seq, fam_seq_compte: dictionnary
+        les dictionnaires renvoyés par create_families
+
+    seuil: int
+        le nombre minimum d'occurrences
+
+    en_tete: string
+        si renseignée, ligne écrite au début des fichiers Rxx_kept_data.txt
+        et seq_sup_N_occ.txt
+    """
+    for fichier in fichiers:
+        save_data_in_txt_file(wanted_par_fichier[fichier], round_name(fichier) + "_kept_data.txt", en_tete)
+
+    for num_fam in fam_seq:
+        save_one_key_dict_in_txt_file(fam_seq[num_fam], f"family_{num_fam}_diff_seq.txt")
+        save_data_in_txt_file(fam_seq_compte[num_fam], f"family_{num_fam}_count_seq.txt")
+
+    save_data_in_txt_file(wanted_seq_all, f"seq_sup_{seuil}_occ.txt", en_tete)
+
+
+def save_round_files(nbr_seq_in_families, freq_seq_in_families, profils, compte, profils_par_famille):
+    """écrit les fichiers intermédiaires de family_in_files.py et de
+    extract.py.
+
+    Parameters
+    ----------
+    nbr_seq_in_families, freq_seq_in_families, profils, compte: dictionnary
+        les dictionnaires renvoyés par round_stage
+
+    profils_par_famille: dictionnary
+        le dictionnaire renvoyé par round_profiles
+    """
+    suffixe = "count_seq"
+
+    for Round in profils:
+        save_data_in_text_file(f"seq_count_by_fam_in_round_{Round}_{suffixe}.txt", compte[Round])
+        save_data_of_nested_dic(f"profil_by_fam_in_round_{Round}_{suffixe}.txt", profils[Round])
+        save_data_in_text_file(f"seq_by_family_in_round_{Round}_{suffixe}.txt", nbr_seq_in_families[Round])
+        save_data_in_text_file(f"freq_by_family_in_round_{Round}_{suffixe}.txt", freq_seq_in_families[Round])
+
+    for famille, profils_famille in profils_par_famille.items():
+        fichiers_saved = []
+        for Round, profil in profils_famille.items():
+            profil_file = f"profil_fam_{famille}_in_{Round}.txt"
+            save_dict_in_txt_file(profil_file, profil)
+            fichiers_saved.append(profil_file)
+        save_list_in_txt_file(f"liste_fichiers_profil_fam_{famille}.txt", fichiers_saved)
+
+
+def main():
+    """Le main du programme."""
+
+    fichiers, options = arguments()
+    intermediaires = options["intermediaires"]
+    cache = None
+    familles = None
+    comptes_par_fichier = None
+    en_tete = None
+
+    if options["heavy_hitters"]:
+        heavy_hitters_warning()
+        en_tete = EN_TETE_HEAVY_HITTERS
+
+    if options["cache"] is not None:
+        cache = StageCache(options["cache"], options["hash_contenu"])
+        parametres = {parametre: options[parametre] for parametre in ("seuil", "heavy_hitters", "dist_max")}
+        cle_familles = cache.key("familles", fichiers, parametres)
+        familles = cached_families(cache, cle_familles, options["nombre_famille"])
+
+    if familles is None or intermediaires:
+        compte_all, wanted_par_fichier, wanted_seq_all, comptes_par_fichier = count_stage(fichiers, options, cache)
+
+    if familles is None:
+        familles = create_families(compte_all, options["nombre_famille"], options["dist_max"],
+                                   options["bktree"], options["workers"])
+        if cache is not None:
+            cache.put("familles", cle_familles, (options["nombre_famille"], familles))
+
+    fam_seq, seq_fam, fam_seq_compte, seq_ref = familles
+    compte_all = None
+
+    save_data_in_txt_file(seq_ref, "seq_de_reference_pour_familles.txt")
+    if options["store"] is not None:
+        CountStore(options["store"]).save_families(fam_seq, fichiers)
+    if intermediaires:
+        save_family_files(fichiers, wanted_par_fichier, wanted_seq_all, fam_seq, fam_seq_compte, options["seuil"], en_tete)
+        wanted_par_fichier = wanted_seq_all = None
+
+    save_data_in_txt_file(family_sizes(fam_seq_compte), "taille_des_familles.txt")
+    save_dict(entropy_stage(fam_seq_compte, options), "shannon_entropy.txt")
+    save_profiles("profil_familles.bin", family_profile_stage(fam_seq_compte, intermediaires))
+
+    nbr_seq_in_families, freq_seq_in_families, profils, compte = round_stage(fam_seq, fichiers, options, cache,
+                                                                             comptes_par_fichier)
+    comptes_par_fichier = None
+    profils_par_famille = round_profiles(profils)
+
+    profils_binaires = {(num_fam, Round): profil for Round in profils
+                        for num_fam, profil in profils[Round].items() if isinstance(profil, dict)}
+    save_profiles("profil_by_fam_in_round_count_seq.bin", profils_binaires)
+    if intermediaires:
+        save_round_files(nbr_seq_in_families, freq_seq_in_families, profils, compte, profils_par_famille)
+
+    if profils_par_famille:
+        comptes, familles, rounds, positions, alphabet, presents = create_profile_array(profils_par_famille)
+        save_results(comptes, familles, rounds, positions, alphabet, presents, options["longueur"] or None)
+
+
+if __name__ == "__main__":
+    main()
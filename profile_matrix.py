@@ -0,0 +1,126 @@
+"""Ce module permet de calculer le profil d'une famille (nombre de chaque
+base à chaque position) à l'aide de tableaux numpy.
+
+Les séquences de même longueur sont rangées dans une matrice d'octets
+(une ligne par séquence unique), chaque base est remplacée par le numéro
+de sa colonne (A, C, G, T, N puis les autres caractères rencontrés), et
+les bases sont comptées à chaque position en une seule opération,
+pondérées par le nombre d'occurrences de chaque séquence.
+
+Usage:
+------
+    from profile_matrix import profile_matrix, profile_dict
+
+    comptes, alphabet = profile_matrix(data, seq_len_max)
+    profils = profile_dict(comptes, alphabet)
+"""
+
+
+############ Modules à importer ############
+
+
+import numpy as np
+
+
+############################################
+
+
+BASES = "ACGTN"
+DECALAGE = 24
+
+
+def encode_sequences(sequences, longueur):
+    """Range des séquences de même longueur dans une matrice d'octets.
+
+    Parameters
+    ----------
+    sequences : list
+        liste de séquences de longueur longueur
+
+    longueur: int
+        la longueur des séquences
+
+    Returns
+    -------
+    matrice: numpy.ndarray
+        matrice uint8 contenant une séquence par ligne
+    """
+    contenu = "".join(sequences).encode("latin-1")
+
+    return np.frombuffer(contenu, dtype = np.uint8).reshape(len(sequences), longueur)
+
+
+def profile_matrix(data, longueur):
+    """compte les bases à chaque position des séquences d'une longueur
+    donnée.
+
+    Parameters
+    ----------
+    data : dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence,
+        seules les séquences de longueur longueur sont comptées
+
+    longueur: int
+        la longueur des séquences à compter
+
+    Returns
+    -------
+    comptes: numpy.ndarray
+        tableau d'entiers de taille longueur x len(alphabet) contenant le
+        nombre de chaque base à chaque position
+
+    alphabet: string
+        les bases correspondant à chaque colonne de comptes
+    """
+    sequences = []
+    nombres = []
+
+    for seq, nombre in data.items():
+        if len(seq) == longueur:
+            sequences.append(seq)
+            nombres.append(nombre)
+
+    if not sequences or longueur == 0:
+        return np.zeros((longueur, len(BASES)), dtype = np.int64), BASES
+
+    matrice = encode_sequences(sequences, longueur)
+
+    presents = np.flatnonzero(np.bincount(matrice.ravel(), minlength = 256))
+    autres = "".join(chr(octet) for octet in presents if chr(octet) not in BASES)
+    alphabet = BASES + autres
+
+    colonnes = np.zeros(256, dtype = np.intp)
+    for i, base in enumerate(alphabet):
+        colonnes[ord(base)] = i
+
+    codes = colonnes[matrice] + np.arange(longueur) * len(alphabet)
+    poids = np.repeat(np.asarray(nombres, dtype = np.float64), longueur)
+    comptes = np.bincount(codes.ravel(), weights = poids, minlength = longueur * len(alphabet))
+
+    return np.rint(comptes).astype(np.int64).reshape(longueur, len(alphabet)), alphabet
+
+
+def profile_dict(comptes, alphabet):
+    """convertit un tableau de comptage en dictionnaire de profil.
+
+    Parameters
+    ----------
+    comptes : numpy.ndarray
+        tableau renvoyé par profile_matrix
+
+    alphabet: string
+        les bases correspondant à chaque colonne de comptes
+
+    Returns
+    -------
+    profils: dictionnary
+        dictionnaire contenant pour chaque position (décalée de 24) le
+        nombre de chaque base présente à cette position
+    """
+    profils = {}
+
+    for j, ligne in enumerate(comptes.tolist()):
+        profils[j + DECALAGE] = {base: nombre for base, nombre in zip(alphabet, ligne) if nombre}
+
+    return profils
+
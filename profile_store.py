@@ -0,0 +1,166 @@
+"""Ce module permet de sauvegarder les profils des familles dans un
+fichier binaire, relu par projection en mémoire (mmap).
+
+Le fichier contient un en-tête (les bases de chaque colonne, le nombre
+de profils et la table des noms de rounds, chaque nom précédé de sa
+longueur), puis pour chaque profil la famille, le numéro du round dans
+cette table, la première position et le nombre de positions, et enfin
+les profils eux-mêmes : un tableau int32 positions x bases par couple
+(famille, round).
+
+Usage:
+------
+    from profile_store import save_profiles, load_profiles
+
+    save_profiles("profils.bin", {(1, "R00"): profil})
+    alphabet, entrees = load_profiles("profils.bin")
+"""
+
+
+############ Modules à importer ############
+
+
+import mmap
+import struct
+import numpy as np
+
+
+############################################
+
+
+SIGNATURE = b"APRF"
+VERSION = 2
+EN_TETE = struct.Struct("<4sIIII")
+NOM = struct.Struct("<H")
+ENTREE = struct.Struct("<iIiiq")
+
+
+def save_profiles(fichier, profils):
+    """sauvegarde des profils dans un fichier binaire.
+
+    Parameters
+    ----------
+    fichier : string
+        le nom du fichier dans lequel les sauvegarder
+
+    profils: dictionnary
+        dictionnaire contenant pour chaque couple (famille, round) un
+        profil {position: {base: nombre}} ; le round peut être une chaîne
+        vide pour un profil calculé sur tous les rounds
+    """
+    bases = []
+
+    for profil in profils.values():
+        for valeur in profil.values():
+            for base in valeur:
+                if base not in bases:
+                    bases.append(base)
+
+    alphabet = "".join(sorted(bases, key = lambda base: ("ACGTN".find(base) % 6, base)))
+    colonne = {base: k for k, base in enumerate(alphabet)}
+    rounds = {}
+
+    for famille, Round in profils:
+        rounds.setdefault(Round, len(rounds))
+
+    noms = b"".join(NOM.pack(len(Round.encode("latin-1"))) + Round.encode("latin-1") for Round in rounds)
+    debut_donnees = EN_TETE.size + len(alphabet) + len(noms) + ENTREE.size * len(profils)
+    debut_donnees += - debut_donnees % 4
+
+    entrees = []
+    tableaux = []
+    position = debut_donnees
+
+    for (famille, Round), profil in profils.items():
+        decalage = min(profil) if profil else 0
+        nb_positions = max(profil) - decalage + 1 if profil else 0
+        comptes = np.zeros((nb_positions, len(alphabet)), dtype = "<i4")
+        for pos, valeur in profil.items():
+            for base, nombre in valeur.items():
+                comptes[pos - decalage, colonne[base]] = nombre
+        entrees.append(ENTREE.pack(int(famille), rounds[Round], decalage, nb_positions, position))
+        tableaux.append(comptes)
+        position += comptes.nbytes
+
+    with open(fichier, "wb") as filout:
+        filout.write(EN_TETE.pack(SIGNATURE, VERSION, len(profils), len(alphabet), len(rounds)))
+        filout.write(alphabet.encode("latin-1"))
+        filout.write(noms)
+        for entree in entrees:
+            filout.write(entree)
+        filout.write(bytes(debut_donnees - filout.tell()))
+        for comptes in tableaux:
+            filout.write(comptes.tobytes())
+
+
+def load_profiles(fichier):
+    """relit un fichier de profils écrit par save_profiles, en le
+    projetant en mémoire.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier binaire à lire
+
+    Returns
+    -------
+    alphabet: string
+        les bases correspondant aux colonnes de chaque profil
+
+    entrees: list
+        liste de tuples (famille, round, première position, profil), où
+        profil est un tableau int32 positions x bases en lecture seule
+    """
+    with open(fichier, "rb") as filin:
+        contenu = mmap.mmap(filin.fileno(), 0, access = mmap.ACCESS_READ)
+
+    signature, version, nb_profils, nb_bases, nb_rounds = EN_TETE.unpack_from(contenu, 0)
+
+    if signature != SIGNATURE or version != VERSION:
+        raise ValueError(f"{fichier} n'est pas un fichier de profils")
+
+    alphabet = contenu[EN_TETE.size:EN_TETE.size + nb_bases].decode("latin-1")
+    debut = EN_TETE.size + nb_bases
+    rounds = []
+
+    for i in range(nb_rounds):
+        longueur, = NOM.unpack_from(contenu, debut)
+        rounds.append(contenu[debut + NOM.size:debut + NOM.size + longueur].decode("latin-1"))
+        debut += NOM.size + longueur
+
+    entrees = []
+
+    for i in range(nb_profils):
+        famille, Round, decalage, nb_positions, position = ENTREE.unpack_from(contenu, debut + i * ENTREE.size)
+        comptes = np.frombuffer(contenu, dtype = "<i4", count = nb_positions * nb_bases, offset = position)
+        entrees.append((famille, rounds[Round], decalage, comptes.reshape(nb_positions, nb_bases)))
+
+    return alphabet, entrees
+
+
+def profile_dict(comptes, alphabet, decalage):
+    """convertit un profil lu par load_profiles en dictionnaire.
+
+    Parameters
+    ----------
+    comptes : numpy.ndarray
+        tableau positions x bases
+
+    alphabet: string
+        les bases correspondant à chaque colonne
+
+    decalage: int
+        la première position du profil
+
+    Returns
+    -------
+    profil: dictionnary
+        dictionnaire contenant pour chaque position le nombre de chaque
+        base présente à cette position
+    """
+    profil = {}
+
+    for j, ligne in enumerate(comptes.tolist()):
+        profil[j + decalage] = {base: nombre for base, nombre in zip(alphabet, ligne) if nombre}
+
+    return profil
@@ -4,7 +4,9 @@ Usage:
 ------
     python3 profils.py arguments
 
-    arguments: le ou les fichier.s texte à analyser
+    arguments: le ou les fichier.s texte à analyser, au format
+    family_N_all_seq.txt (une séquence par ligne) ou family_N_count_seq.txt
+    (une séquence unique et son nombre d'occurrences par ligne)
 """
 
 
@@ -12,8 +14,10 @@ Usage:
 
 
 import sys
-from tqdm import tqdm
 import operator
+from fasta_reader import read_family, family_number
+from profile_matrix import profile_matrix, profile_dict
+from profile_store import save_profiles
 
 
 ############################################
@@ -50,16 +54,12 @@ def read_txt_files(fichier):
 
     Returns
     -------
-    data: list
-        liste des séquences de la famille
+    data: dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+        de la famille
     """ 
 
-    data = []
-    
-    with open(fichier, "r") as filin:
-        lines = filin.readlines()
-        for line in lines:
-            data.append(line.strip())
+    data = read_family(fichier)
 
     return data
 
@@ -69,8 +69,9 @@ def compte_seq_len(data):
     
     Parameters
     ----------
-    data: list
-        liste des séquences de la famille
+    data: dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+        de la famille
 
     Returns
     -------
@@ -81,13 +82,13 @@ def compte_seq_len(data):
     """
 
     compte = {}
-    for seq in data:
+    for seq, nombre in data.items():
         cle = len(seq)
         if cle in compte.keys():
-            compte[cle] += 1
+            compte[cle] += nombre
         else:
             compte[cle] = 0
-            compte[cle] += 1
+            compte[cle] += nombre
 
     return compte
 
@@ -124,8 +125,9 @@ def create_profils(compte, seq_len_max, data):
         la longueur de la séquence apparaissant le plus de fois dans
         le dictionnaire fournit en argument.
 
-    data: list
-        liste des séquences de la famille
+    data: dictionnary
+        dictionnaire contenant le nombre d'occurrences de chaque séquence
+        de la famille
 
     Returns
     -------
@@ -133,21 +135,8 @@ def create_profils(compte, seq_len_max, data):
         dictionnaire contenant le profil de la famille
     """
 
-    profils = {}
-    wanted_seq = [data[i] for i in range(len(data)) if len(data[i]) == seq_len_max]
-    
-    for seq in tqdm(wanted_seq):
-        for j, base in enumerate(seq):
-            
-            if (j + 24) not in profils.keys():
-                profils[j + 24] = {}
-            
-            if base not in profils[j + 24].keys():
-                profils[j + 24][base] = 1
-            
-            else:
-                profils[j + 24][base] += 1
-
+    comptes, alphabet = profile_matrix(data, seq_len_max)
+    profils = profile_dict(comptes, alphabet)
 
     return profils
 
@@ -189,17 +178,22 @@ def main():
     """Le main du programme.""" 
     
     fichiers = arguments()
+    profils_binaires = {}
     
     for fichier in fichiers:
         data = read_txt_files(fichier)
         compte = compte_seq_len(data)
         compte = dict(sorted(compte.items(), key = lambda t: t[0]))
-        compte_data = "nbr_seq_len_family_{}.txt".format(fichier.strip("family__all_seq.txt"))
+        num_fam = family_number(fichier)
+        compte_data = "nbr_seq_len_family_{}.txt".format(num_fam)
         save_in_text_file(compte, compte_data)
         seq_len_max = extract_max_from_dict(compte)
         profils = create_profils(compte, seq_len_max, data)
-        profil_file = "profil_famille_{}.txt".format(fichier.strip("family__all_seq.txt"))
+        profil_file = "profil_famille_{}.txt".format(num_fam)
         save_profil(profils, profil_file)
+        profils_binaires[(num_fam, "")] = profils
+
+    save_profiles("profil_familles.bin", profils_binaires)
 
 
 
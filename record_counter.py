@@ -0,0 +1,200 @@
+"""Ce module permet de compter rapidement les séquences de fichiers texte
+(une séquence par ligne) ou fasta (une séquence par enregistrement ">").
+
+Chaque fichier est projeté en mémoire (mmap) et les retours à la ligne
+(ou les débuts d'enregistrement) sont comptés par blocs avec numpy, qui
+libère le GIL : plusieurs fichiers peuvent ainsi être comptés en même
+temps par un groupe de threads. Le nombre de séquences uniques peut être
+obtenu par un second passage optionnel, qui garde une empreinte de chaque
+séquence.
+
+Usage:
+------
+    from record_counter import count_files
+
+    comptes = count_files(fichiers, threads = 8, uniques = True)
+"""
+
+
+############ Modules à importer ############
+
+
+import os
+import mmap
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from fasta_reader import read_fasta, read_counts, is_count_file
+
+
+############################################
+
+
+TAILLE_BLOC = 1 << 26
+RETOUR = ord("\n")
+CHEVRON = ord(">")
+
+
+def is_fasta_file(fichier):
+    """Indique si un fichier est au format fasta.
+
+    Parameters
+    ----------
+    fichier : string
+        nom du fichier
+
+    Returns
+    -------
+    bool
+        True pour les fichiers .fas, .fasta et .fa
+    """
+    return fichier.endswith((".fas", ".fasta", ".fa"))
+
+
+def count_in_buffer(contenu, fasta = False, taille_bloc = TAILLE_BLOC):
+    """compte les séquences contenues dans un tampon d'octets.
+
+    Parameters
+    ----------
+    contenu : mmap.mmap
+        le contenu du fichier, non vide
+
+    fasta: bool
+        si True, compte les débuts d'enregistrement (">" en début de
+        ligne) au lieu des lignes
+
+    taille_bloc: int
+        le nombre d'octets comptés à la fois
+
+    Returns
+    -------
+    nombre: int
+        le nombre de lignes ou d'enregistrements
+    """
+    octets = np.frombuffer(contenu, dtype = np.uint8)
+    nombre = 0
+
+    for debut in range(0, len(octets), taille_bloc):
+        if fasta:
+            bloc = octets[max(debut - 1, 0):debut + taille_bloc]
+            nombre += int(np.count_nonzero((bloc[:-1] == RETOUR) & (bloc[1:] == CHEVRON)))
+        else:
+            nombre += int(np.count_nonzero(octets[debut:debut + taille_bloc] == RETOUR))
+
+    if fasta:
+        nombre += int(octets[0] == CHEVRON)
+    elif octets[-1] != RETOUR:
+        nombre += 1
+
+    return nombre
+
+
+def count_records(fichier, taille_bloc = TAILLE_BLOC):
+    """compte les séquences d'un fichier sans le lire ligne par ligne.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier texte (une séquence par ligne) ou fasta à lire
+
+    taille_bloc: int
+        le nombre d'octets comptés à la fois
+
+    Returns
+    -------
+    nombre: int
+        le nombre de lignes du fichier, ou le nombre d'enregistrements
+        pour un fichier fasta
+    """
+    if os.path.getsize(fichier) == 0:
+        return 0
+
+    with open(fichier, "rb") as filin:
+        with mmap.mmap(filin.fileno(), 0, access = mmap.ACCESS_READ) as contenu:
+            return count_in_buffer(contenu, is_fasta_file(fichier), taille_bloc)
+
+
+def count_unique_records(fichier):
+    """compte les séquences différentes d'un fichier.
+
+    Seule une empreinte de chaque séquence est conservée.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier texte (une séquence par ligne) ou fasta à lire
+
+    Returns
+    -------
+    nombre: int
+        le nombre de séquences différentes
+    """
+    if is_fasta_file(fichier):
+        return len({hash(seq) for seq in read_fasta(fichier)})
+
+    if os.path.getsize(fichier) == 0:
+        return 0
+
+    with open(fichier, "rb") as filin:
+        with mmap.mmap(filin.fileno(), 0, access = mmap.ACCESS_READ) as contenu:
+            return len({hash(line.strip()) for line in iter(contenu.readline, b"")})
+
+
+def count_file(fichier, uniques = False):
+    """compte les séquences d'un fichier de famille ou d'un fichier fasta.
+
+    Parameters
+    ----------
+    fichier : string
+        fichier à lire
+
+    uniques: bool
+        si True, compte aussi les séquences différentes
+
+    Returns
+    -------
+    nombre: int
+        le nombre de séquences. Pour un fichier family_N_count_seq.txt,
+        c'est la somme des nombres d'occurrences.
+
+    nombre_uniques: int
+        le nombre de séquences différentes, ou None si uniques est False
+    """
+    if is_count_file(fichier):
+        nombre = 0
+        nombre_uniques = 0
+        for seq, nombre_seq in read_counts(fichier):
+            nombre += nombre_seq
+            nombre_uniques += 1
+        return nombre, nombre_uniques if uniques else None
+
+    nombre = count_records(fichier)
+
+    return nombre, count_unique_records(fichier) if uniques else None
+
+
+def count_files(fichiers, threads = 1, uniques = False):
+    """compte les séquences de plusieurs fichiers en parallèle.
+
+    Parameters
+    ----------
+    fichiers : list
+        liste des fichiers à lire
+
+    threads: int
+        le nombre de threads
+
+    uniques: bool
+        si True, compte aussi les séquences différentes
+
+    Returns
+    -------
+    comptes: dictionnary
+        dictionnaire contenant pour chaque fichier le tuple (nombre de
+        séquences, nombre de séquences différentes ou None)
+    """
+    if threads == 1 or len(fichiers) == 1:
+        return {fichier: count_file(fichier, uniques) for fichier in fichiers}
+
+    with ThreadPoolExecutor(max_workers = threads) as executeur:
+        resultats = executeur.map(count_file, fichiers, [uniques] * len(fichiers))
+        return dict(zip(fichiers, resultats))
@@ -0,0 +1,295 @@
+"""Ce module permet d'associer à chaque séquence unique un identifiant
+entier, et de stocker les séquences sous forme compacte.
+
+Chaque base A, C, G ou T est codée sur 2 bits : une séquence est
+convertie en un entier (précédé d'un bit sentinelle qui donne sa
+longueur), rangé dans un tampon d'octets. Les séquences contenant une
+autre base (N, minuscules...) sont conservées telles quelles.
+
+Usage:
+------
+    from seq_catalogue import SeqCatalogue
+
+    catalogue = SeqCatalogue()
+    identifiant = catalogue.add("ACGT")
+    catalogue.sequence(identifiant)
+"""
+
+
+############ Modules à importer ############
+
+
+import os
+import mmap
+from array import array
+
+
+############################################
+
+
+VERS_CHIFFRES = str.maketrans("ACGT", "0123")
+SANS_ACGT = str.maketrans("", "", "ACGT")
+HEXA_VERS_BASES = str.maketrans({format(chiffre, "x"): "ACGT"[chiffre >> 2] + "ACGT"[chiffre & 3]
+                                 for chiffre in range(16)})
+
+
+def encode(seq):
+    """Code une séquence sur 2 bits par base.
+
+    Parameters
+    ----------
+    seq : string
+        la séquence à coder
+
+    Returns
+    -------
+    code: int
+        l'entier codant la séquence, ou None si elle contient une base
+        autre que A, C, G ou T.
+    """
+    if seq.translate(SANS_ACGT):
+        return None
+
+    return int("1" + seq.translate(VERS_CHIFFRES), 4)
+
+
+def decode(code):
+    """Retrouve une séquence à partir de son code.
+
+    Parameters
+    ----------
+    code : int
+        l'entier codant la séquence
+
+    Returns
+    -------
+    seq: string
+        la séquence
+    """
+    longueur = (code.bit_length() - 1) // 2
+    bases = format(code, "x").translate(HEXA_VERS_BASES)
+
+    return bases[len(bases) - longueur:]
+
+
+class SeqCatalogue:
+    """Catalogue des séquences uniques.
+
+    Les identifiants sont attribués dans l'ordre d'ajout, à partir de 0.
+    Le code de la séquence d'identifiant i est rangé dans le tampon entre
+    les positions debuts[i] et debuts[i + 1].
+
+    Un catalogue relu avec load() est projeté en mémoire (mmap) : le
+    dictionnaire séquence -> identifiant n'est reconstruit qu'à la
+    première recherche par séquence.
+    """
+
+    def __init__(self, sequences = ()):
+        """Crée un catalogue.
+
+        Parameters
+        ----------
+        sequences : iterable
+            les séquences à ajouter
+        """
+        self.tampon = bytearray()
+        self.debuts = array("Q", [0])
+        self.index = {}
+        self.echappees = {}
+
+        for seq in sequences:
+            self.add(seq)
+
+    def __len__(self):
+        return len(self.debuts) - 1
+
+    def _build_index(self):
+        """Reconstruit le dictionnaire séquence -> identifiant et rend le
+        catalogue modifiable."""
+        self.tampon = bytearray(self.tampon)
+        self.debuts = array("Q", self.debuts)
+        self.index = {}
+
+        for identifiant in range(len(self)):
+            code = self.code(identifiant)
+            self.index[self.echappees[identifiant] if code is None else code] = identifiant
+
+    def __contains__(self, seq):
+        return self.get_id(seq) is not None
+
+    def add(self, seq):
+        """Ajoute une séquence au catalogue si elle n'y est pas déjà.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence à ajouter
+
+        Returns
+        -------
+        identifiant: int
+            l'identifiant de la séquence
+        """
+        if self.index is None:
+            self._build_index()
+
+        code = encode(seq)
+        cle = seq if code is None else code
+        identifiant = self.index.get(cle)
+
+        if identifiant is not None:
+            return identifiant
+
+        identifiant = len(self)
+        self.index[cle] = identifiant
+
+        if code is None:
+            self.echappees[identifiant] = seq
+        else:
+            self.tampon += code.to_bytes((code.bit_length() + 7) // 8, "big")
+        self.debuts.append(len(self.tampon))
+
+        return identifiant
+
+    def get_id(self, seq):
+        """Donne l'identifiant d'une séquence sans l'ajouter.
+
+        Parameters
+        ----------
+        seq : string
+            la séquence recherchée
+
+        Returns
+        -------
+        identifiant: int
+            l'identifiant de la séquence, ou None si elle n'est pas dans
+            le catalogue.
+        """
+        if self.index is None:
+            self._build_index()
+
+        code = encode(seq)
+
+        return self.index.get(seq if code is None else code)
+
+    def code(self, identifiant):
+        """Donne le code d'une séquence du catalogue.
+
+        Parameters
+        ----------
+        identifiant : int
+            l'identifiant de la séquence
+
+        Returns
+        -------
+        code: int
+            l'entier codant la séquence, ou None pour une séquence
+            contenant une base autre que A, C, G ou T.
+        """
+        if identifiant in self.echappees:
+            return None
+
+        return int.from_bytes(self.tampon[self.debuts[identifiant]:self.debuts[identifiant + 1]], "big")
+
+    def sequence(self, identifiant):
+        """Donne la séquence associée à un identifiant.
+
+        Parameters
+        ----------
+        identifiant : int
+            l'identifiant de la séquence
+
+        Returns
+        -------
+        seq: string
+            la séquence
+        """
+        if identifiant in self.echappees:
+            return self.echappees[identifiant]
+
+        return decode(self.code(identifiant))
+
+    def length(self, identifiant):
+        """Donne la longueur d'une séquence sans la décoder.
+
+        Parameters
+        ----------
+        identifiant : int
+            l'identifiant de la séquence
+
+        Returns
+        -------
+        longueur: int
+            la longueur de la séquence
+        """
+        if identifiant in self.echappees:
+            return len(self.echappees[identifiant])
+
+        return (self.code(identifiant).bit_length() - 1) // 2
+
+    def save(self, dossier):
+        """Sauvegarde le catalogue dans un dossier.
+
+        Parameters
+        ----------
+        dossier : string
+            le dossier dans lequel écrire catalogue_tampon.bin,
+            catalogue_debuts.bin et catalogue_echappees.txt
+        """
+        os.makedirs(dossier, exist_ok = True)
+
+        with open(os.path.join(dossier, "catalogue_tampon.bin"), "wb") as filout:
+            filout.write(self.tampon)
+
+        with open(os.path.join(dossier, "catalogue_debuts.bin"), "wb") as filout:
+            filout.write(array("Q", self.debuts).tobytes())
+
+        with open(os.path.join(dossier, "catalogue_echappees.txt"), "w") as filout:
+            for identifiant, seq in self.echappees.items():
+                filout.write(f"{identifiant} {seq}\n")
+
+    @classmethod
+    def load(cls, dossier):
+        """Relit un catalogue sauvegardé avec save(), en le projetant
+        en mémoire.
+
+        Parameters
+        ----------
+        dossier : string
+            le dossier contenant le catalogue
+
+        Returns
+        -------
+        catalogue: SeqCatalogue
+            le catalogue
+        """
+        catalogue = cls()
+        catalogue.index = None
+        catalogue.tampon = _map_file(os.path.join(dossier, "catalogue_tampon.bin"))
+        catalogue.debuts = _map_file(os.path.join(dossier, "catalogue_debuts.bin")).cast("Q")
+
+        with open(os.path.join(dossier, "catalogue_echappees.txt"), "r") as filin:
+            for line in filin:
+                identifiant, seq = line.split()
+                catalogue.echappees[int(identifiant)] = seq
+
+        return catalogue
+
+
+def _map_file(fichier):
+    """Projette un fichier binaire en mémoire, en lecture seule.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier à projeter
+
+    Returns
+    -------
+    contenu: memoryview
+        le contenu du fichier
+    """
+    with open(fichier, "rb") as filin:
+        if os.fstat(filin.fileno()).st_size == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(filin.fileno(), 0, access = mmap.ACCESS_READ))
@@ -0,0 +1,153 @@
+"""Ce module permet de garder le résultat des étapes de pipeline.py d'une
+exécution à l'autre.
+
+Le résultat de chaque étape est enregistré (pickle) dans un dossier, sous
+une clé calculée à partir de ses entrées : la signature des fichiers lus
+(taille et date de modification, ou empreinte du contenu) et les
+paramètres de l'étape. Une étape dont les entrées n'ont pas changé n'est
+pas recalculée.
+
+Usage:
+------
+    from stage_cache import StageCache
+
+    cache = StageCache("cache_pipeline")
+    cle = cache.key("comptage", ["R00.fastq_result.fas"], {"seuil": 1000})
+    resultat = cache.get("comptage", cle)
+    if resultat is None:
+        resultat = ...
+        cache.put("comptage", cle, resultat)
+"""
+
+
+############ Modules à importer ############
+
+
+import os
+import json
+import pickle
+import hashlib
+
+
+############################################
+
+
+TAILLE_BLOC = 1 << 20
+
+
+def file_signature(fichier, contenu = False):
+    """donne la signature d'un fichier.
+
+    Parameters
+    ----------
+    fichier : string
+        le fichier
+
+    contenu: bool
+        si True, la signature est l'empreinte du contenu du fichier ;
+        sinon, c'est sa taille et sa date de modification
+
+    Returns
+    -------
+    signature: list
+        l'empreinte du contenu, ou le nom du fichier suivi de sa taille et
+        de sa date de modification
+    """
+    if not contenu:
+        etat = os.stat(fichier)
+        return [os.path.abspath(fichier), etat.st_size, etat.st_mtime_ns]
+
+    empreinte = hashlib.blake2b()
+
+    with open(fichier, "rb") as filin:
+        for bloc in iter(lambda: filin.read(TAILLE_BLOC), b""):
+            empreinte.update(bloc)
+
+    return [empreinte.hexdigest()]
+
+
+class StageCache:
+    """Dossier contenant le résultat des étapes déjà calculées.
+
+    Parameters
+    ----------
+    dossier : string
+        le dossier du cache, créé s'il n'existe pas
+
+    contenu: bool
+        si True, les fichiers sont reconnus à l'empreinte de leur contenu
+        plutôt qu'à leur taille et leur date de modification
+    """
+
+    def __init__(self, dossier, contenu = False):
+        self.dossier = dossier
+        self.contenu = contenu
+        self.signatures = {}
+        os.makedirs(dossier, exist_ok = True)
+
+    def signature(self, fichier):
+        """donne la signature d'un fichier, calculée une seule fois."""
+        if fichier not in self.signatures:
+            self.signatures[fichier] = file_signature(fichier, self.contenu)
+
+        return self.signatures[fichier]
+
+    def digest(self, valeur):
+        """donne l'empreinte d'une valeur (dictionnaire, liste...)
+        pouvant être écrite en json."""
+        texte = json.dumps(valeur, sort_keys = True, default = str)
+
+        return hashlib.sha256(texte.encode("utf-8")).hexdigest()
+
+    def key(self, etape, fichiers = (), parametres = None):
+        """donne la clé d'une étape.
+
+        Parameters
+        ----------
+        etape : string
+            le nom de l'étape
+
+        fichiers: list
+            les fichiers lus par l'étape, dans l'ordre de lecture
+
+        parametres: dictionnary
+            les paramètres dont dépend le résultat de l'étape
+
+        Returns
+        -------
+        cle: string
+            l'empreinte des entrées de l'étape
+        """
+        return self.digest([etape, [self.signature(fichier) for fichier in fichiers], parametres])
+
+    def path(self, etape, cle):
+        """donne le fichier contenant le résultat d'une étape."""
+        return os.path.join(self.dossier, f"{etape}_{cle}.pkl")
+
+    def get(self, etape, cle):
+        """relit le résultat d'une étape.
+
+        Returns
+        -------
+        resultat:
+            le résultat enregistré, ou None s'il n'y en a pas
+        """
+        fichier = self.path(etape, cle)
+
+        if not os.path.exists(fichier):
+            return None
+
+        with open(fichier, "rb") as filin:
+            return pickle.load(filin)
+
+    def put(self, etape, cle, resultat):
+        """enregistre le résultat d'une étape.
+
+        Le fichier est écrit sous un nom temporaire puis renommé : un
+        arrêt pendant l'écriture ne laisse pas de résultat incomplet.
+        """
+        fichier = self.path(etape, cle)
+
+        with open(fichier + ".tmp", "wb") as filout:
+            pickle.dump(resultat, filout, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(fichier + ".tmp", fichier)